@@ -6,16 +6,49 @@ from flask import (
     redirect,
     url_for,
     flash,
-    send_from_directory,
     abort,
+    stream_template,
+    Response,
+    send_file,
 )
 from datetime import date
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
+from werkzeug.exceptions import HTTPException
+from werkzeug.utils import secure_filename
 import os
 import logging
 from decimal import Decimal
 import json
+import secrets
+import tempfile
+import time
+
+from bulk import (
+    attach_tags,
+    chapter_range_size,
+    insert_pages,
+    parse_chapter_list,
+    parse_chapter_number,
+    upsert_tags,
+)
+from catalog_io import (
+    EXPORT_FORMATS,
+    EXPORT_SCOPES,
+    IMPORT_FORMATS,
+    XLSX_MIMETYPE,
+    stream_export,
+    write_xlsx,
+)
+from content_store import CONTENT_STORE_ENABLED, ContentStore
+from db import create_pool
+from images import Thumbnailer, send_image
+from ingest import ArchiveError, ingest_archive
+from jobs import cancel_job, enqueue, get_job, retry_job
+from pagination import Keyset, count_rows, fetch_page
+from scanner import LIBRARY_PATTERNS, compile_pattern
+from search import escape_like, normalize_query, search_text_sql
 
 
 app = Flask(__name__)
@@ -32,6 +65,52 @@ DATABASE_URL = os.environ.get(
 
 # Data directory configuration
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+thumbnailer = Thumbnailer(DATA_DIR)
+content_store = ContentStore(DATA_DIR)
+
+# Largest batches the bulk chapter, page and tag endpoints accept per request
+BULK_CHAPTER_LIMIT = 10000
+BULK_PAGE_LIMIT = 10000
+BULK_TAG_LIMIT = 50000
+
+# Rows per page of the admin list views
+ADMIN_PAGE_SIZE = int(os.environ.get("ADMIN_PAGE_SIZE", 20))
+
+# Tag and author list orders: (keyset columns, descending). Each has a
+# matching index; "usage" is the trigger-maintained manga_count.
+TAG_SORTS = {
+    "name": (["tag_name"], False),
+    "usage": (["manga_count", "tag_id"], True),
+}
+AUTHOR_SORTS = {
+    "name": (["name_romanized", "author_id"], False),
+    "usage": (["manga_count", "author_id"], True),
+}
+
+# Dashboard numbers come from the trigger-maintained catalog_stats table
+# ("counters") or from the planner's row estimates in pg_class ("estimates")
+DASHBOARD_STATS = os.environ.get("DASHBOARD_STATS", "counters")
+
+
+@app.template_global()
+def page_url(**cursor):
+    """URL of the current list view at another keyset page"""
+    args = request.args.to_dict()
+    args.pop("after", None)
+    args.pop("before", None)
+    args.update((key, value) for key, value in cursor.items() if value)
+    return url_for(request.endpoint, **request.view_args, **args)
+
+
+@app.template_global()
+def image_url(image_path, width=None):
+    """Versioned URL of an image, optionally resized to ``width``"""
+    return url_for(
+        "serve_image",
+        image_path=image_path,
+        w=width,
+        v=thumbnailer.version(image_path),
+    )
 
 
 @app.template_filter("tojsonfilter")
@@ -39,11 +118,13 @@ def to_json_filter(obj):
     return json.dumps(obj)
 
 
+db_pool = create_pool(DATABASE_URL)
+
+
 def get_db_connection():
-    """Get database connection"""
+    """Get a pooled database connection"""
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
+        return db_pool.getconn()
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         return None
@@ -52,6 +133,72 @@ def get_db_connection():
 # ====================== DASHBOARD ======================
 
 
+def _dashboard_estimates(cur):
+    cur.execute(
+        """
+        SELECT relname, GREATEST(reltuples, 0)::BIGINT
+        FROM pg_class
+        WHERE oid IN ('manga'::regclass, 'chapter'::regclass, 'author'::regclass,
+                      'tag'::regclass, 'pages'::regclass)
+        """
+    )
+    counts = dict(cur.fetchall())
+    return {
+        "manga_count": counts["manga"],
+        "chapter_count": counts["chapter"],
+        "author_count": counts["author"],
+        "tag_count": counts["tag"],
+        "page_count": counts["pages"],
+        "estimated": True,
+    }
+
+
+def load_dashboard_stats(conn, cur):
+    """Dashboard statistics in one query, without counting any table"""
+    if DASHBOARD_STATS == "estimates":
+        return _dashboard_estimates(cur)
+    try:
+        cur.execute(
+            """
+            SELECT s.stat, s.scope, l.language_name_en, s.value
+            FROM (
+                SELECT stat, scope, SUM(value)::BIGINT AS value
+                FROM catalog_stats
+                GROUP BY stat, scope
+            ) s
+            LEFT JOIN language l ON l.language_id = s.scope
+            WHERE s.value <> 0
+            ORDER BY s.stat, s.value DESC, s.scope
+            """
+        )
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        logger.warning(
+            "catalog_stats is missing (apply migrations/012_catalog_stats.sql); "
+            "showing estimated counts"
+        )
+        return _dashboard_estimates(cur)
+
+    counters = {}
+    pages_by_language = []
+    for stat, scope, language_name, value in cur.fetchall():
+        if stat == "pages":
+            pages_by_language.append((language_name or scope, value))
+        counters[stat] = counters.get(stat, 0) + value
+    chapter_count = counters.get("chapters", 0)
+    return {
+        "manga_count": counters.get("manga", 0),
+        "chapter_count": chapter_count,
+        "author_count": counters.get("authors", 0),
+        "tag_count": counters.get("tags", 0),
+        "page_count": counters.get("pages", 0),
+        "untranslated_count": chapter_count - counters.get("translated_chapters", 0),
+        "missing_pages_count": chapter_count - counters.get("chapters_with_pages", 0),
+        "pages_by_language": pages_by_language,
+        "estimated": False,
+    }
+
+
 @app.route("/")
 def dashboard():
     """Admin dashboard with statistics"""
@@ -62,23 +209,7 @@ def dashboard():
 
     try:
         with conn.cursor() as cur:
-            # Get statistics
-            stats = {}
-
-            cur.execute("SELECT COUNT(*) FROM manga")
-            stats["manga_count"] = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM chapter")
-            stats["chapter_count"] = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM author")
-            stats["author_count"] = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM tag")
-            stats["tag_count"] = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM pages")
-            stats["page_count"] = cur.fetchone()[0]
+            stats = load_dashboard_stats(conn, cur)
 
             # Recent activity
             cur.execute("""
@@ -108,9 +239,6 @@ def dashboard():
 def manga_list():
     """List all manga with search"""
     search = request.args.get("search", "")
-    page = int(request.args.get("page", 1))
-    per_page = 20
-    offset = (page - 1) * per_page
 
     conn = get_db_connection()
     if not conn:
@@ -119,44 +247,36 @@ def manga_list():
 
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            # Build query with search
-            where_clause = ""
+            # Title order with manga_id as tie-breaker, served by
+            # idx_manga_title_key (also for the search, via the trigram index)
+            query = """
+                SELECT manga_id, name_english, name_romanized, name_original,
+                       manga_status, started_publishing, created_at,
+                       COALESCE(name_english, name_romanized, name_original, '')
+                           AS title_key
+                FROM manga m
+            """
             params = []
-
             if search:
-                where_clause = """
-                    WHERE LOWER(COALESCE(name_english, name_romanized, name_original)) 
-                    LIKE LOWER(%s)
-                """
-                params.append(f"%{search}%")
-
-            # Get total count
-            count_query = f"SELECT COUNT(*) FROM manga {where_clause}"
-            cur.execute(count_query, params)
-            total = cur.fetchone()[0]
-
-            # Get manga list
-            query = f"""
-                SELECT manga_id, name_english, name_romanized, name_original, 
-                       manga_status, started_publishing, created_at
-                FROM manga {where_clause}
-                ORDER BY COALESCE(name_english, name_romanized, name_original)
-                LIMIT %s OFFSET %s
-            """
-            params.extend([per_page, offset])
-            cur.execute(query, params)
-            manga_list = cur.fetchall()
-
-            # Calculate pagination
-            total_pages = (total + per_page - 1) // per_page
+                query += f" WHERE {search_text_sql()} LIKE %s"
+                params.append(f"%{escape_like(normalize_query(search))}%")
+
+            page = fetch_page(
+                cur,
+                Keyset(["title_key", "manga_id"]),
+                query,
+                params,
+                after=request.args.get("after"),
+                before=request.args.get("before"),
+                limit=ADMIN_PAGE_SIZE,
+            )
+            page.total, page.exact = count_rows(cur, query, params)
 
             return render_template(
                 "admin/manga/list.html",
-                manga_list=manga_list,
-                search=search,
+                manga_list=page.rows,
                 page=page,
-                total_pages=total_pages,
-                total=total,
+                search=search,
             )
 
     except Exception as e:
@@ -196,7 +316,9 @@ def manga_new():
                     request.form.get("manga_status", "unknown"),
                     request.form.get("started_publishing") or None,
                     request.form.get("ended_publishing") or None,
-                    request.form.get("cover_path") or None,
+                    content_store.put_if_enabled(
+                        request.form.get("cover_path") or None
+                    ),
                 ),
             )
             manga_id = cur.fetchone()[0]
@@ -679,23 +801,22 @@ def page_list(chapter_id, language_id):
 
 @app.route("/images/<path:image_path>")
 def serve_image(image_path):
-    """Serve images from the data directory"""
+    """Serve images from the data directory, resized when ?w= is given"""
     try:
-        if ".." in image_path or image_path.startswith("/"):
+        full_path = thumbnailer.resolve(image_path, request.args.get("w", type=int))
+        if full_path is None:
             abort(404)
 
-        full_path = os.path.join(DATA_DIR, image_path)
-
-        if not os.path.exists(full_path) or not os.path.abspath(full_path).startswith(
-            os.path.abspath(DATA_DIR)
-        ):
-            abort(404)
-
-        directory = os.path.dirname(full_path)
-        filename = os.path.basename(full_path)
-
-        return send_from_directory(directory, filename)
+        # Stored copies never change; everything else, hardlinked objects
+        # included, is pinned by ?v=
+        version = request.args.get("v")
+        versioned = thumbnailer.is_immutable(image_path) or (
+            version is not None and version == thumbnailer.version(image_path)
+        )
+        return send_image(full_path, versioned=versioned)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error serving image {image_path}: {e}")
         abort(404)
@@ -760,7 +881,9 @@ def page_new(chapter_id, language_id):
                 """,
                     (
                         int(request.form["page_num"]),
-                        request.form.get("page_path") or None,
+                        content_store.put_if_enabled(
+                            request.form.get("page_path") or None
+                        ),
                         chapter_id,
                         language_id,
                     ),
@@ -814,47 +937,87 @@ def bulk_create_chapters(manga_id):
                 flash("Manga not found", "error")
                 return redirect(url_for("manga_list"))
 
+            cur.execute(
+                """
+                SELECT l.language_id, l.language_name_en
+                FROM language l
+                JOIN supports s ON l.language_id = s.language_id
+                WHERE s.manga_id = %s
+                ORDER BY l.language_name_en
+            """,
+                (manga_id,),
+            )
+            languages = cur.fetchall()
+
+            def render_form():
+                return render_template(
+                    "admin/bulk/chapters.html",
+                    manga=manga,
+                    languages=languages,
+                )
+
             if request.method == "GET":
-                return render_template("admin/bulk/chapters.html", manga=manga)
+                return render_form()
 
             else:  # POST request
-                start_chapter = int(request.form["start_chapter"])
-                end_chapter = int(request.form["end_chapter"])
-
-                if start_chapter > end_chapter:
+                mode = request.form.get("mode", "range")
+                try:
+                    if mode == "list":
+                        numbers = parse_chapter_list(
+                            request.form.get("chapter_list", "")
+                        )
+                        count = len(numbers)
+                    else:
+                        numbers = None
+                        start_chapter = parse_chapter_number(
+                            request.form["start_chapter"]
+                        )
+                        end_chapter = parse_chapter_number(request.form["end_chapter"])
+                        step = parse_chapter_number(request.form.get("step") or "1")
+                        if step <= 0:
+                            raise ValueError("Step must be greater than zero")
+                        if start_chapter > end_chapter:
+                            raise ValueError(
+                                "Start chapter must be less than or equal to end chapter"
+                            )
+                        count = chapter_range_size(start_chapter, end_chapter, step)
+                except ValueError as e:
+                    flash(str(e), "error")
+                    return render_form()
+
+                if count == 0:
+                    flash("No chapter numbers given", "error")
+                    return render_form()
+                if count > BULK_CHAPTER_LIMIT:
                     flash(
-                        "Start chapter must be less than or equal to end chapter",
+                        f"At most {BULK_CHAPTER_LIMIT} chapters can be created at once",
                         "error",
                     )
-                    return render_template("admin/bulk/chapters.html", manga=manga)
-
-                created_count = 0
-                skipped_count = 0
-
-                for chapter_num in range(start_chapter, end_chapter + 1):
-                    try:
-                        cur.execute(
-                            """
-                            INSERT INTO chapter (chapter_num, manga_id)
-                            VALUES (%s, %s)
-                        """,
-                            (Decimal(str(chapter_num)), manga_id),
-                        )
-                        created_count += 1
-                    except psycopg2.IntegrityError:
-                        # Chapter already exists, skip it
-                        skipped_count += 1
-                        conn.rollback()
-                        conn = get_db_connection()  # Get new connection after rollback
-                        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-                        continue
-
-                conn.commit()
-                flash(
-                    f"Bulk operation completed! Created {created_count} chapters, skipped {skipped_count} existing chapters.",
-                    "success",
+                    return render_form()
+
+                if numbers is not None:
+                    params = {"numbers": [str(number) for number in numbers]}
+                else:
+                    params = {
+                        "start": str(start_chapter),
+                        "end": str(end_chapter),
+                        "step": str(step),
+                    }
+                job_id = enqueue(
+                    cur,
+                    "bulk_chapters",
+                    {
+                        "manga_id": manga_id,
+                        "language_ids": request.form.getlist("language_ids"),
+                        **params,
+                    },
+                    label=f"Create {count} chapters for "
+                    f"{manga['name_english'] or manga['name_romanized'] or manga['name_original']}",
+                    return_url=url_for("chapter_list", manga_id=manga_id),
                 )
-                return redirect(url_for("chapter_list", manga_id=manga_id))
+                conn.commit()
+                flash("Chapter creation queued", "success")
+                return redirect(url_for("job_detail", job_id=job_id))
 
     except Exception as e:
         conn.rollback()
@@ -1011,88 +1174,43 @@ def bulk_create_pages(chapter_id, language_id):
                         suggested_paths=suggested_paths,
                     )
 
-                # Track results
-                created_count = 0
-                skipped_count = 0
-                errors = []
-
-                # Create pages in range
-                for page_num in range(start_page, end_page + 1):
-                    try:
-                        # Check if page already exists
-                        if page_num in existing_pages:
-                            if skip_existing:
-                                skipped_count += 1
-                                continue
-                            else:
-                                errors.append(f"Page {page_num} already exists")
-                                continue
-
-                        # Generate page path
-                        page_path = f"{base_path}/{page_num}{file_extension}"
-
-                        # Insert page
-                        cur.execute(
-                            """
-                            INSERT INTO pages (page_num, page_path, chapter_id, language_id)
-                            VALUES (%s, %s, %s, %s)
-                        """,
-                            (page_num, page_path, chapter_id, language_id),
-                        )
-                        created_count += 1
-
-                    except psycopg2.IntegrityError:
-                        # Page already exists (race condition)
-                        skipped_count += 1
-                        conn.rollback()
-                        conn = get_db_connection()  # Get new connection after rollback
-                        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-                        continue
-                    except Exception as e:
-                        errors.append(f"Error creating page {page_num}: {str(e)}")
-                        continue
-
-                # Commit all successful inserts
-                conn.commit()
-
-                # Update chapter page count if requested
-                if request.form.get("update_chapter_count") == "on":
-                    cur.execute(
-                        "SELECT COUNT(*) FROM pages WHERE chapter_id = %s AND language_id = %s",
-                        (chapter_id, language_id),
-                    )
-                    total_pages = cur.fetchone()[0]
-
-                    cur.execute(
-                        "UPDATE chapter SET page_count = %s WHERE chapter_id = %s",
-                        (total_pages, chapter_id),
-                    )
-                    conn.commit()
-
-                # Build result message
-                message_parts = []
-                if created_count > 0:
-                    message_parts.append(f"Created {created_count} pages")
-                if skipped_count > 0:
-                    message_parts.append(f"skipped {skipped_count} existing pages")
-                if errors:
-                    message_parts.append(f"{len(errors)} errors occurred")
-
-                if message_parts:
+                if end_page - start_page + 1 > BULK_PAGE_LIMIT:
                     flash(
-                        "Bulk operation completed: " + ", ".join(message_parts),
-                        "success" if not errors else "warning",
+                        f"At most {BULK_PAGE_LIMIT} pages can be created at once",
+                        "error",
+                    )
+                    return render_template(
+                        "admin/pages/bulk_form.html",
+                        chapter=chapter_info,
+                        language_id=language_id,
+                        existing_pages=existing_pages,
+                        next_page_num=next_page_num,
+                        suggested_paths=suggested_paths,
                     )
 
-                if errors:
-                    for error in errors[:5]:  # Show first 5 errors
-                        flash(error, "error")
-                    if len(errors) > 5:
-                        flash(f"... and {len(errors) - 5} more errors", "error")
-
-                return redirect(
-                    url_for("page_list", chapter_id=chapter_id, language_id=language_id)
+                job_id = enqueue(
+                    cur,
+                    "bulk_pages",
+                    {
+                        "chapter_id": chapter_id,
+                        "language_id": language_id,
+                        "start": start_page,
+                        "end": end_page,
+                        "base_path": base_path,
+                        "extension": file_extension,
+                        "skip_existing": skip_existing,
+                        "update_chapter_count": request.form.get("update_chapter_count")
+                        == "on",
+                    },
+                    label=f"Create pages {start_page}-{end_page} for chapter "
+                    f"{chapter_info['chapter_num']} ({chapter_info['language_name_en']})",
+                    return_url=url_for(
+                        "page_list", chapter_id=chapter_id, language_id=language_id
+                    ),
                 )
+                conn.commit()
+                flash("Page creation queued", "success")
+                return redirect(url_for("job_detail", job_id=job_id))
 
     except Exception as e:
         conn.rollback()
@@ -1105,77 +1223,467 @@ def bulk_create_pages(chapter_id, language_id):
         conn.close()
 
 
-# ====================== DATA EXPORT ======================
+@app.route(
+    "/chapters/<int:chapter_id>/pages/<language_id>/upload", methods=["GET", "POST"]
+)
+def upload_pages(chapter_id, language_id):
+    """Create a chapter's pages from an uploaded CBZ/ZIP archive"""
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
+        return redirect(url_for("manga_list"))
+
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            cur.execute(
+                """
+                SELECT c.*, m.name_english, m.name_romanized, m.name_original, m.manga_id,
+                       l.language_name_en, tt.chapter_id IS NOT NULL AS translated,
+                       (SELECT COALESCE(MAX(page_num), 0) + 1 FROM pages
+                        WHERE chapter_id = c.chapter_id AND language_id = l.language_id)
+                           AS next_page_num
+                FROM chapter c
+                JOIN manga m ON c.manga_id = m.manga_id
+                JOIN language l ON l.language_id = %s
+                LEFT JOIN translated_to tt
+                    ON tt.chapter_id = c.chapter_id AND tt.language_id = l.language_id
+                WHERE c.chapter_id = %s
+            """,
+                (language_id, chapter_id),
+            )
+            chapter_info = cur.fetchone()
+    except Exception as e:
+        logger.error(f"Page upload error: {e}")
+        flash(f"Error loading chapter: {str(e)}", "error")
+        return redirect(url_for("manga_list"))
+    finally:
+        conn.close()
 
+    if not chapter_info:
+        flash("Chapter or language not found", "error")
+        return redirect(url_for("manga_list"))
+    if not chapter_info["translated"]:
+        flash("Translation does not exist for this chapter", "error")
+        return redirect(url_for("chapter_translations", chapter_id=chapter_id))
+
+    if request.method == "GET":
+        return render_template(
+            "admin/pages/upload_form.html",
+            chapter=chapter_info,
+            language_id=language_id,
+        )
+
+    upload = request.files.get("archive")
+    if not upload or not upload.filename:
+        flash("Please choose a CBZ or ZIP archive", "error")
+        return render_template(
+            "admin/pages/upload_form.html",
+            chapter=chapter_info,
+            language_id=language_id,
+        )
+
+    start_page = (
+        request.form.get("start_page", type=int) or chapter_info["next_page_num"]
+    )
+    overwrite = request.form.get("overwrite") == "on"
+    update_count = request.form.get("update_chapter_count") == "on"
+
+    def insert(pages):
+        paths = {start_page + position - 1: path for position, path in pages}
+        conn = get_db_connection()
+        if not conn:
+            raise ArchiveError("Database connection error")
+        try:
+            with conn.cursor() as cur:
+                created, updated, skipped = insert_pages(
+                    cur, chapter_id, language_id, paths.items(), overwrite=overwrite
+                )
+                if update_count:
+                    cur.execute(
+                        """
+                        UPDATE chapter SET page_count = (
+                            SELECT COUNT(*) FROM pages
+                            WHERE chapter_id = %s AND language_id = %s
+                        )
+                        WHERE chapter_id = %s
+                    """,
+                        (chapter_id, language_id, chapter_id),
+                    )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return {
+            "created": len(created),
+            "updated": len(updated),
+            "skipped": len(skipped),
+            "unused": [paths[page_num] for page_num in skipped],
+        }
+
+    def events():
+        try:
+            yield from ingest_archive(
+                upload.stream,
+                DATA_DIR,
+                f"uploads/manga_{chapter_info['manga_id']}/chapter_{chapter_id}/"
+                f"{secure_filename(language_id)}",
+                insert,
+                store=content_store if CONTENT_STORE_ENABLED else None,
+            )
+        except ArchiveError as e:
+            yield {"stage": "error", "message": str(e)}
+        except Exception as e:
+            logger.error(f"Page upload error: {e}")
+            yield {"stage": "error", "message": f"Error during upload: {str(e)}"}
+
+    return stream_template(
+        "admin/pages/upload_progress.html",
+        chapter=chapter_info,
+        language_id=language_id,
+        events=events(),
+    )
+
+
+@app.route("/library/scan", methods=["GET", "POST"])
+def library_scan():
+    """Queue a scan registering chapters and pages found under the data directory"""
+    patterns = LIBRARY_PATTERNS
+    if request.method == "GET":
+        return render_template("admin/library/scan.html", patterns=patterns)
+
+    patterns = [
+        line.strip()
+        for line in request.form.get("patterns", "").splitlines()
+        if line.strip()
+    ] or LIBRARY_PATTERNS
+    try:
+        for pattern in patterns:
+            compile_pattern(pattern)
+    except ValueError as e:
+        flash(str(e), "error")
+        return render_template("admin/library/scan.html", patterns=patterns)
 
-@app.route("/export/manga")
-def export_manga():
-    """Export manga data as JSON"""
     conn = get_db_connection()
     if not conn:
         flash("Database connection error", "error")
         return redirect(url_for("dashboard"))
 
     try:
-        import json
-        from flask import Response
+        with conn.cursor() as cur:
+            dry_run = request.form.get("dry_run") == "on"
+            job_id = enqueue(
+                cur,
+                "library_scan",
+                {
+                    "patterns": patterns,
+                    "full": request.form.get("full") == "on",
+                    "dry_run": dry_run,
+                },
+                label="Library scan (dry run)" if dry_run else "Library scan",
+                return_url=url_for("library_scan"),
+                max_attempts=1,
+            )
+        conn.commit()
+        flash("Library scan queued", "success")
+        return redirect(url_for("job_detail", job_id=job_id))
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Library scan error: {e}")
+        flash(f"Error queuing library scan: {str(e)}", "error")
+        return render_template("admin/library/scan.html", patterns=patterns)
+    finally:
+        conn.close()
+
+
+# ====================== BACKGROUND JOBS ======================
 
+
+@app.route("/jobs")
+def job_list():
+    """Recent background jobs"""
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
+        return redirect(url_for("dashboard"))
+
+    try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            # Get all manga with related data
-            cur.execute("""
-                SELECT 
-                    m.*,
-                    ARRAY_AGG(DISTINCT t.tag_name) FILTER (WHERE t.tag_name IS NOT NULL) as tags,
-                    ARRAY_AGG(DISTINCT a.name_romanized || COALESCE(' (' || w.role || ')', '')) 
-                        FILTER (WHERE a.name_romanized IS NOT NULL) as authors,
-                    ARRAY_AGG(DISTINCT l.language_name_en) FILTER (WHERE l.language_name_en IS NOT NULL) as languages
-                FROM manga m
-                LEFT JOIN has h ON m.manga_id = h.manga_id
-                LEFT JOIN tag t ON h.tag_id = t.tag_id
-                LEFT JOIN writes w ON m.manga_id = w.manga_id
-                LEFT JOIN author a ON w.author_id = a.author_id
-                LEFT JOIN supports s ON m.manga_id = s.manga_id
-                LEFT JOIN language l ON s.language_id = l.language_id
-                GROUP BY m.manga_id
-                ORDER BY m.manga_id
-            """)
+            cur.execute(
+                """
+                SELECT job_id, kind, label, status, progress, total, message,
+                       attempts, max_attempts, created_at, finished_at
+                FROM job
+                ORDER BY created_at DESC
+                LIMIT 100
+            """
+            )
+            jobs = cur.fetchall()
+        return render_template("admin/jobs/list.html", jobs=jobs)
+    except Exception as e:
+        logger.error(f"Job list error: {e}")
+        flash(f"Error loading jobs: {str(e)}", "error")
+        return redirect(url_for("dashboard"))
+    finally:
+        conn.close()
 
-            manga_list = []
-            for row in cur.fetchall():
-                manga_data = dict(row)
-                # Convert dates to strings
-                if manga_data["started_publishing"]:
-                    manga_data["started_publishing"] = manga_data[
-                        "started_publishing"
-                    ].isoformat()
-                if manga_data["ended_publishing"]:
-                    manga_data["ended_publishing"] = manga_data[
-                        "ended_publishing"
-                    ].isoformat()
-                if manga_data["created_at"]:
-                    manga_data["created_at"] = manga_data["created_at"].isoformat()
-                if manga_data["updated_at"]:
-                    manga_data["updated_at"] = manga_data["updated_at"].isoformat()
-
-                manga_list.append(manga_data)
-
-            # Create JSON response
-            json_data = json.dumps(manga_list, indent=2, ensure_ascii=False)
-
-            response = Response(
-                json_data,
-                mimetype="application/json",
-                headers={
-                    "Content-Disposition": "attachment; filename=manga_export.json"
-                },
+
+@app.route("/jobs/<int:job_id>")
+def job_detail(job_id):
+    """Job progress page; HTMX requests get just the status panel to poll"""
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
+        return redirect(url_for("dashboard"))
+
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            job = get_job(cur, job_id)
+    except Exception as e:
+        logger.error(f"Job detail error: {e}")
+        flash(f"Error loading job: {str(e)}", "error")
+        return redirect(url_for("job_list"))
+    finally:
+        conn.close()
+
+    if not job:
+        flash("Job not found", "error")
+        return redirect(url_for("job_list"))
+
+    if request.headers.get("HX-Request"):
+        return render_template("admin/jobs/_status.html", job=job)
+    return render_template("admin/jobs/detail.html", job=job)
+
+
+@app.route("/jobs/<int:job_id>/cancel", methods=["POST"])
+def job_cancel(job_id):
+    """Cancel a queued or running job"""
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
+        return redirect(url_for("job_list"))
+
+    try:
+        with conn.cursor() as cur:
+            status = cancel_job(cur, job_id)
+        conn.commit()
+        if status == "cancelled":
+            flash("Job cancelled", "success")
+        elif status == "running":
+            flash(
+                "Cancellation requested; the job stops at its next checkpoint", "info"
+            )
+        else:
+            flash("Job has already finished", "warning")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Job cancel error: {e}")
+        flash(f"Error cancelling job: {str(e)}", "error")
+    finally:
+        conn.close()
+    return redirect(url_for("job_detail", job_id=job_id))
+
+
+@app.route("/jobs/<int:job_id>/retry", methods=["POST"])
+def job_retry(job_id):
+    """Queue a failed or cancelled job again"""
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
+        return redirect(url_for("job_list"))
+
+    try:
+        with conn.cursor() as cur:
+            retried = retry_job(cur, job_id)
+        conn.commit()
+        if retried:
+            flash("Job queued again", "success")
+        else:
+            flash("Only failed or cancelled jobs can be retried", "warning")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Job retry error: {e}")
+        flash(f"Error retrying job: {str(e)}", "error")
+    finally:
+        conn.close()
+    return redirect(url_for("job_detail", job_id=job_id))
+
+
+@app.route("/jobs/thumbnails", methods=["POST"])
+def queue_thumbnails():
+    """Queue thumbnail rendering for one manga, or the whole catalog"""
+    manga_id = request.form.get("manga_id", type=int)
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
+        return redirect(url_for("job_list"))
+
+    try:
+        with conn.cursor() as cur:
+            job_id = enqueue(
+                cur,
+                "thumbnails",
+                {"manga_id": manga_id},
+                label=(
+                    f"Thumbnails for manga {manga_id}"
+                    if manga_id
+                    else "Thumbnails for the whole catalog"
+                ),
+                return_url=(
+                    url_for("manga_edit", manga_id=manga_id) if manga_id else None
+                ),
             )
+        conn.commit()
+        flash("Thumbnail rendering queued", "success")
+        return redirect(url_for("job_detail", job_id=job_id))
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Thumbnail job error: {e}")
+        flash(f"Error queuing thumbnails: {str(e)}", "error")
+        return redirect(url_for("job_list"))
+    finally:
+        conn.close()
+
+
+# ====================== DATA EXPORT ======================
+
+
+@app.route("/export")
+def export_data():
+    """Export options"""
+    return render_template(
+        "admin/export.html", formats=EXPORT_FORMATS, scopes=EXPORT_SCOPES
+    )
+
 
-            return response
+@app.route("/export/manga")
+def export_manga():
+    """Stream the catalog as JSON, NDJSON or CSV"""
+    fmt = request.args.get("format", "json")
+    if fmt not in EXPORT_FORMATS:
+        flash(f"Unknown export format: {fmt}", "error")
+        return redirect(url_for("export_data"))
+    mimetype, extension = EXPORT_FORMATS[fmt]
 
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
+        return redirect(url_for("dashboard"))
+
+    try:
+        chunks = stream_export(conn, fmt, request.args.getlist("include"))
+        # Run the query now so that errors can still be reported as a flash
+        first = next(chunks, b"")
     except Exception as e:
+        conn.rollback()
+        conn.close()
         logger.error(f"Export error: {e}")
         flash(f"Error exporting data: {str(e)}", "error")
+        return redirect(url_for("export_data"))
+
+    def generate():
+        yield first
+        try:
+            yield from chunks
+        except Exception as e:
+            logger.error(f"Export error: {e}")
+            raise
+
+    def finish():
+        # Also runs when the client disconnects mid-download
+        try:
+            chunks.close()
+        except Exception as e:
+            logger.error(f"Export cleanup error: {e}")
+        finally:
+            conn.close()
+
+    response = Response(
+        generate(),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=manga_export.{extension}"
+        },
+    )
+    response.call_on_close(finish)
+    return response
+
+
+@app.route("/export/manga.xlsx")
+def export_manga_xlsx():
+    """Export the catalog as an XLSX workbook"""
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
+        return redirect(url_for("dashboard"))
+
+    # The workbook is assembled on disk and streamed from there
+    spool = tempfile.TemporaryFile()
+    try:
+        write_xlsx(conn, spool)
+    except Exception as e:
+        conn.rollback()
+        spool.close()
+        logger.error(f"XLSX export error: {e}")
+        flash(f"Error exporting data: {str(e)}", "error")
+        return redirect(url_for("export_data"))
+    finally:
+        conn.close()
+
+    spool.seek(0)
+    return send_file(
+        spool,
+        mimetype=XLSX_MIMETYPE,
+        as_attachment=True,
+        download_name="manga_export.xlsx",
+    )
+
+
+@app.route("/import", methods=["GET", "POST"])
+def import_data():
+    """Queue an import of a catalog file"""
+    if request.method == "GET":
+        return render_template("admin/import.html", formats=IMPORT_FORMATS)
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Please choose a file to import", "error")
+        return render_template("admin/import.html", formats=IMPORT_FORMATS)
+    fmt = os.path.splitext(upload.filename)[1].lower().lstrip(".")
+    if fmt not in IMPORT_FORMATS:
+        flash(f"Unsupported file type; expected {', '.join(IMPORT_FORMATS)}", "error")
+        return render_template("admin/import.html", formats=IMPORT_FORMATS)
+
+    conn = get_db_connection()
+    if not conn:
+        flash("Database connection error", "error")
         return redirect(url_for("dashboard"))
+
+    # The job reads the file from the data directory and removes it when done
+    path = f".cache/imports/{time.time_ns()}-{secrets.token_hex(4)}.{fmt}"
+    full_path = os.path.join(DATA_DIR, path)
+    try:
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        upload.save(full_path)
+        with conn.cursor() as cur:
+            job_id = enqueue(
+                cur,
+                "catalog_import",
+                {"path": path, "fmt": fmt},
+                label=f"Import {secure_filename(upload.filename)}",
+                return_url=url_for("import_data"),
+            )
+        conn.commit()
+        flash("Import queued", "success")
+        return redirect(url_for("job_detail", job_id=job_id))
+    except Exception as e:
+        conn.rollback()
+        if os.path.exists(full_path):
+            os.unlink(full_path)
+        logger.error(f"Import error: {e}")
+        flash(f"Error queuing import: {str(e)}", "error")
+        return render_template("admin/import.html", formats=IMPORT_FORMATS)
     finally:
         conn.close()
 
@@ -1227,7 +1735,9 @@ def page_edit(page_id):
                 """,
                     (
                         int(request.form["page_num"]),
-                        request.form.get("page_path") or None,
+                        content_store.put_if_enabled(
+                            request.form.get("page_path") or None
+                        ),
                         page_id,
                     ),
                 )
@@ -1353,14 +1863,14 @@ def advanced_search():
             if entity_type in ["manga", "all"]:
                 # Search manga
                 cur.execute(
-                    """
+                    f"""
                     SELECT manga_id, name_english, name_romanized, name_original, manga_status
-                    FROM manga
-                    WHERE LOWER(COALESCE(name_english, name_romanized, name_original)) LIKE LOWER(%s)
+                    FROM manga m
+                    WHERE {search_text_sql()} LIKE %s
                     ORDER BY COALESCE(name_english, name_romanized, name_original)
                     LIMIT 20
                 """,
-                    (f"%{query}%",),
+                    (f"%{escape_like(normalize_query(query))}%",),
                 )
                 results["manga"] = cur.fetchall()
 
@@ -1415,12 +1925,22 @@ def health():
     try:
         conn = get_db_connection()
         if conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-            conn.close()
-            return {"status": "healthy", "database": "connected"}, 200
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            finally:
+                conn.close()
+            return {
+                "status": "healthy",
+                "database": "connected",
+                "pool": db_pool.stats(),
+            }, 200
         else:
-            return {"status": "unhealthy", "database": "disconnected"}, 503
+            return {
+                "status": "unhealthy",
+                "database": "disconnected",
+                "pool": db_pool.stats(),
+            }, 503
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}, 503
 
@@ -1508,7 +2028,9 @@ def manga_edit(manga_id):
                         request.form.get("manga_status", "unknown"),
                         request.form.get("started_publishing") or None,
                         request.form.get("ended_publishing") or None,
-                        request.form.get("cover_path") or None,
+                        content_store.put_if_enabled(
+                            request.form.get("cover_path") or None
+                        ),
                         manga_id,
                     ),
                 )
@@ -1557,6 +2079,9 @@ def manga_delete(manga_id):
 def tag_list():
     """List all tags"""
     search = request.args.get("search", "")
+    sort = request.args.get("sort", "name")
+    if sort not in TAG_SORTS:
+        sort = "name"
 
     conn = get_db_connection()
     if not conn:
@@ -1565,20 +2090,32 @@ def tag_list():
 
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            query = """
-                SELECT t.tag_id, t.tag_name, COUNT(h.manga_id) as manga_count
-                FROM tag t
-                LEFT JOIN has h ON t.tag_id = h.tag_id
-                WHERE (%s = '' OR LOWER(t.tag_name) LIKE LOWER(%s))
-                GROUP BY t.tag_id, t.tag_name
-                ORDER BY t.tag_name
-            """
-
-            search_param = f"%{search}%"
-            cur.execute(query, (search, search_param))
-            tags = cur.fetchall()
+            # manga_count is kept current by triggers on has
+            query = "SELECT tag_id, tag_name, manga_count FROM tag t"
+            params = []
+            if search:
+                query += " WHERE LOWER(t.tag_name) LIKE %s"
+                params.append(f"%{escape_like(normalize_query(search))}%")
+
+            columns, descending = TAG_SORTS[sort]
+            page = fetch_page(
+                cur,
+                Keyset(columns, descending=descending),
+                query,
+                params,
+                after=request.args.get("after"),
+                before=request.args.get("before"),
+                limit=ADMIN_PAGE_SIZE,
+            )
+            page.total, page.exact = count_rows(cur, query, params)
 
-            return render_template("admin/tags/list.html", tags=tags, search=search)
+            return render_template(
+                "admin/tags/list.html",
+                tags=page.rows,
+                page=page,
+                search=search,
+                sort=sort,
+            )
 
     except Exception as e:
         logger.error(f"Tag list error: {e}")
@@ -1671,14 +2208,42 @@ def api_tag_create():
 
 @app.route("/api/tags/bulk", methods=["POST"])
 def api_tags_bulk_create():
-    """API endpoint for bulk creating tags"""
+    """API endpoint for bulk creating tags, optionally attaching them to manga"""
     try:
         tag_names = request.json.get("tag_names", [])
+        manga_ids = request.json.get("manga_ids", [])
 
         if not tag_names or not isinstance(tag_names, list):
             return jsonify(
                 {"success": False, "error": "Tag names array is required"}
             ), 400
+        if len(tag_names) > BULK_TAG_LIMIT:
+            return jsonify(
+                {
+                    "success": False,
+                    "error": f"At most {BULK_TAG_LIMIT} tags can be sent at once",
+                }
+            ), 400
+        if not isinstance(manga_ids, list) or not all(
+            isinstance(manga_id, int) for manga_id in manga_ids
+        ):
+            return jsonify(
+                {"success": False, "error": "Manga IDs must be an array of integers"}
+            ), 400
+
+        names = []
+        errors = []
+        for tag_name in tag_names:
+            if not isinstance(tag_name, str):
+                errors.append(f"Not a tag name: {tag_name!r}")
+                continue
+            tag_name = tag_name.strip()
+            if not tag_name:
+                continue
+            if len(tag_name) > 100:
+                errors.append(f"Tag name too long: '{tag_name[:20]}...'")
+                continue
+            names.append(tag_name)
 
         conn = get_db_connection()
         if not conn:
@@ -1686,50 +2251,35 @@ def api_tags_bulk_create():
                 {"success": False, "error": "Database connection error"}
             ), 500
 
-        created_tags = []
-        existing_tags = []
-        errors = []
-
         try:
             with conn.cursor() as cur:
-                for tag_name in tag_names:
-                    tag_name = tag_name.strip()
-                    if not tag_name:
-                        continue
-
-                    try:
-                        cur.execute(
-                            "INSERT INTO tag (tag_name) VALUES (%s) RETURNING tag_id",
-                            (tag_name,),
-                        )
-                        tag_id = cur.fetchone()[0]
-                        created_tags.append(
-                            {"id": tag_id, "name": tag_name, "manga_count": 0}
-                        )
-                    except psycopg2.IntegrityError:
-                        # Tag already exists
-                        existing_tags.append(tag_name)
-                        conn.rollback()
-                        conn = get_db_connection()  # Get new connection after rollback
-                        cur = conn.cursor()
-                        continue
-                    except Exception as e:
-                        errors.append(f"Error creating '{tag_name}': {str(e)}")
-                        continue
-
-                conn.commit()
+                tags = upsert_tags(cur, names)
+                attached = attach_tags(cur, manga_ids, [tag["id"] for tag in tags])
+            conn.commit()
 
-                return jsonify(
-                    {
-                        "success": True,
-                        "created": len(created_tags),
-                        "existing": len(existing_tags),
-                        "errors": len(errors),
-                        "created_tags": created_tags,
-                        "existing_tags": existing_tags,
-                        "error_details": errors,
-                    }
-                )
+            created_tags = [
+                {"id": tag["id"], "name": tag["name"], "manga_count": 0}
+                for tag in tags
+                if tag["created"]
+            ]
+            existing_tags = [
+                {"id": tag["id"], "name": tag["name"]}
+                for tag in tags
+                if not tag["created"]
+            ]
+            return jsonify(
+                {
+                    "success": True,
+                    "created": len(created_tags),
+                    "existing": len(existing_tags),
+                    "errors": len(errors),
+                    "attached": attached,
+                    "tags": tags,
+                    "created_tags": created_tags,
+                    "existing_tags": existing_tags,
+                    "error_details": errors,
+                }
+            )
 
         except Exception as e:
             conn.rollback()
@@ -1750,6 +2300,9 @@ def api_tags_bulk_create():
 def author_list():
     """List all authors"""
     search = request.args.get("search", "")
+    sort = request.args.get("sort", "name")
+    if sort not in AUTHOR_SORTS:
+        sort = "name"
 
     conn = get_db_connection()
     if not conn:
@@ -1758,21 +2311,31 @@ def author_list():
 
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            query = """
-                SELECT a.author_id, a.name_romanized, COUNT(w.manga_id) as manga_count
-                FROM author a
-                LEFT JOIN writes w ON a.author_id = w.author_id
-                WHERE (%s = '' OR LOWER(a.name_romanized) LIKE LOWER(%s))
-                GROUP BY a.author_id, a.name_romanized
-                ORDER BY a.name_romanized
-            """
-
-            search_param = f"%{search}%"
-            cur.execute(query, (search, search_param))
-            authors = cur.fetchall()
+            # manga_count is kept current by triggers on writes
+            query = "SELECT author_id, name_romanized, manga_count FROM author a"
+            params = []
+            if search:
+                query += " WHERE LOWER(a.name_romanized) LIKE %s"
+                params.append(f"%{escape_like(normalize_query(search))}%")
+
+            columns, descending = AUTHOR_SORTS[sort]
+            page = fetch_page(
+                cur,
+                Keyset(columns, descending=descending),
+                query,
+                params,
+                after=request.args.get("after"),
+                before=request.args.get("before"),
+                limit=ADMIN_PAGE_SIZE,
+            )
+            page.total, page.exact = count_rows(cur, query, params)
 
             return render_template(
-                "admin/authors/list.html", authors=authors, search=search
+                "admin/authors/list.html",
+                authors=page.rows,
+                page=page,
+                search=search,
+                sort=sort,
             )
 
     except Exception as e:
@@ -1952,16 +2515,15 @@ def search_manga():
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
             cur.execute(
-                """
+                f"""
                 SELECT manga_id, 
                        COALESCE(name_english, name_romanized, name_original) as title
-                FROM manga
-                WHERE LOWER(COALESCE(name_english, name_romanized, name_original)) 
-                      LIKE LOWER(%s)
+                FROM manga m
+                WHERE {search_text_sql()} LIKE %s
                 ORDER BY title
                 LIMIT 20
             """,
-                (f"%{query}%",),
+                (f"%{escape_like(normalize_query(query))}%",),
             )
 
             manga = [
@@ -2135,22 +2697,31 @@ def chapter_list(manga_id):
                 flash("Manga not found", "error")
                 return redirect(url_for("manga_list"))
 
-            # Get chapters
-            cur.execute(
-                """
-                SELECT c.*, COUNT(p.page_id) as page_count
+            # Chapter numbers are unique per manga, so they alone are the
+            # keyset; pages are only counted for the chapters shown
+            query = """
+                SELECT c.chapter_id, c.chapter_num, c.manga_id, c.created_at,
+                       (SELECT COUNT(*) FROM pages p
+                        WHERE p.chapter_id = c.chapter_id) AS page_count
                 FROM chapter c
-                LEFT JOIN pages p ON c.chapter_id = p.chapter_id
                 WHERE c.manga_id = %s
-                GROUP BY c.chapter_id
-                ORDER BY c.chapter_num
-            """,
-                (manga_id,),
+            """
+            page = fetch_page(
+                cur,
+                Keyset(["chapter_num"]),
+                query,
+                [manga_id],
+                after=request.args.get("after"),
+                before=request.args.get("before"),
+                limit=ADMIN_PAGE_SIZE,
             )
-            chapters = cur.fetchall()
+            page.total, page.exact = count_rows(cur, query, [manga_id])
 
             return render_template(
-                "admin/chapters/list.html", manga=manga, chapters=chapters
+                "admin/chapters/list.html",
+                manga=manga,
+                chapters=page.rows,
+                page=page,
             )
 
     except Exception as e:
@@ -0,0 +1,110 @@
+"""Streaming CBZ (ZIP) archives
+
+Archives are written with stored (uncompressed) entries straight into a
+generator: images are already compressed, and each chunk is handed to the
+caller as soon as it is written, so memory use does not depend on the
+archive size.
+"""
+
+import io
+import logging
+import os
+import re
+import time
+import zipfile
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Sniffed MIME type -> extension used for the stored page
+IMAGE_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+}
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink collecting bytes until they are drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries, chunk_size=CHUNK_SIZE):
+    """Yield a stored ZIP archive of ``(arcname, full_path)`` entries
+
+    Files that disappear or cannot be read are skipped. Because the output
+    is not seekable, sizes and CRCs are written in data descriptors after
+    each entry.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(
+        buffer, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True
+    ) as archive:
+        for arcname, full_path in entries:
+            try:
+                fh = open(full_path, "rb")
+            except OSError as e:
+                logger.warning(f"Skipping {full_path} in archive: {e}")
+                continue
+            with fh:
+                st = os.fstat(fh.fileno())
+                zinfo = zipfile.ZipInfo(
+                    arcname, date_time=time.localtime(st.st_mtime)[:6]
+                )
+                zinfo.compress_type = zipfile.ZIP_STORED
+                # Lets zipfile decide up front whether Zip64 headers are needed
+                zinfo.file_size = st.st_size
+                with archive.open(zinfo, mode="w") as dest:
+                    for chunk in iter(lambda: fh.read(chunk_size), b""):
+                        dest.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    # Central directory, written when the archive is closed
+    data = buffer.drain()
+    if data:
+        yield data
+
+
+def natural_key(name):
+    """Sort key ordering 'page2' before 'page10'"""
+    return [
+        int(part) if part.isdigit() else part.lower()
+        for part in re.split(r"(\d+)", name)
+    ]
+
+
+def page_entry_name(page_num, full_path, folder=None):
+    """Archive name for a page: zero-padded so readers sort pages correctly"""
+    extension = os.path.splitext(full_path)[1].lower()
+    name = f"{page_num:04d}{extension}"
+    return f"{folder}/{name}" if folder else name
+
+
+def chapter_folder_name(chapter_num):
+    """Folder for a chapter in a whole-manga archive, e.g. 'Chapter 0012.5'"""
+    number = format(Decimal(chapter_num).normalize(), "f")
+    whole, _, fraction = number.partition(".")
+    name = f"Chapter {int(whole):04d}"
+    return f"{name}.{fraction}" if fraction else name
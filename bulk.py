@@ -0,0 +1,268 @@
+"""Set-based bulk writes used by the admin"""
+
+import re
+from decimal import Decimal, InvalidOperation
+
+import psycopg2.extras
+
+# chapter.chapter_num is DECIMAL(10,2)
+CHAPTER_NUM_QUANTUM = Decimal("0.01")
+CHAPTER_NUM_MAX = Decimal("99999999.99")
+
+
+def copy_value(value):
+    """Format a value as a field of COPY's text format"""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def insert_pages(cur, chapter_id, language_id, pages, overwrite=False):
+    """Insert ``(page_num, page_path)`` rows for a chapter in one statement
+
+    Existing pages are left alone, or repointed at the new path when
+    ``overwrite`` is set. Returns ``(created, updated, skipped)`` lists of
+    page numbers, taken from the statement's RETURNING rows.
+    """
+    pages = list(pages)
+    if not pages:
+        return [], [], []
+
+    conflict = (
+        "DO UPDATE SET page_path = EXCLUDED.page_path" if overwrite else "DO NOTHING"
+    )
+    rows = psycopg2.extras.execute_values(
+        cur,
+        f"""
+        INSERT INTO pages (chapter_id, language_id, page_num, page_path)
+        VALUES %s
+        ON CONFLICT (chapter_id, page_num, language_id) {conflict}
+        RETURNING page_num, (xmax = 0) AS inserted
+        """,
+        [(chapter_id, language_id, page_num, path) for page_num, path in pages],
+        page_size=len(pages),
+        fetch=True,
+    )
+
+    return _split_returning(rows, [page_num for page_num, _ in pages])
+
+
+def insert_page_range(
+    cur, chapter_id, language_id, start, end, base_path, extension, overwrite=False
+):
+    """Insert pages ``start``..``end`` with paths ``<base_path>/<n><extension>``
+
+    The rows are generated server-side with generate_series, so the whole
+    range is a single statement whatever its size. Returns ``(created,
+    updated, skipped)`` like insert_pages.
+    """
+    conflict = (
+        "DO UPDATE SET page_path = EXCLUDED.page_path" if overwrite else "DO NOTHING"
+    )
+    cur.execute(
+        f"""
+        INSERT INTO pages (chapter_id, language_id, page_num, page_path)
+        SELECT %s, %s, n, %s || '/' || n || %s
+        FROM generate_series(%s::int, %s::int) AS n
+        ON CONFLICT (chapter_id, page_num, language_id) {conflict}
+        RETURNING page_num, (xmax = 0) AS inserted
+        """,
+        (chapter_id, language_id, base_path, extension, start, end),
+    )
+    return _split_returning(cur.fetchall(), range(start, end + 1))
+
+
+def _split_returning(rows, page_nums):
+    # (xmax = 0) is true for freshly inserted rows and false for rows that
+    # ON CONFLICT DO UPDATE rewrote; pages missing from RETURNING were skipped
+    created = sorted(row[0] for row in rows if row[1])
+    updated = sorted(row[0] for row in rows if not row[1])
+    returned = {row[0] for row in rows}
+    skipped = sorted(page_num for page_num in page_nums if page_num not in returned)
+    return created, updated, skipped
+
+
+def parse_chapter_number(text):
+    """Parse a chapter number such as '12' or '10.5'; raises ValueError"""
+    try:
+        number = Decimal(text.strip())
+    except (InvalidOperation, AttributeError):
+        raise ValueError(f"Invalid chapter number: {text!r}")
+    if not number.is_finite() or number < 0 or number > CHAPTER_NUM_MAX:
+        raise ValueError(f"Chapter number out of range: {text!r}")
+    if number != number.quantize(CHAPTER_NUM_QUANTUM):
+        raise ValueError(f"Chapter numbers have at most two decimals: {text!r}")
+    return number
+
+
+def parse_chapter_list(text):
+    """Parse a comma or whitespace separated list like '10, 10.5, 11'
+
+    Duplicates are dropped and the result is sorted.
+    """
+    return sorted(
+        {parse_chapter_number(part) for part in re.split(r"[\s,;]+", text) if part}
+    )
+
+
+def chapter_range_size(start, end, step):
+    """Number of chapters ``generate_series(start, end, step)`` produces"""
+    if step <= 0 or start > end:
+        return 0
+    return int((end - start) // step) + 1
+
+
+def insert_chapters(
+    cur, manga_id, numbers=None, start=None, end=None, step=1, language_ids=()
+):
+    """Create chapters for a manga in one statement
+
+    Either ``numbers`` (an explicit list, e.g. for fractional chapters) or
+    ``start``/``end``/``step`` (expanded server-side with generate_series)
+    selects the chapter numbers. Existing chapters are skipped. For each
+    language in ``language_ids`` the manga supports, a translated_to row is
+    added to every requested chapter that lacks one.
+
+    Returns ``(created, skipped, translations)``: the created and skipped
+    chapter numbers, and the number of translated_to rows inserted.
+    """
+    if numbers is not None:
+        series = "SELECT unnest(%s::numeric[]) AS n"
+        params = [list(numbers)]
+    else:
+        series = "SELECT generate_series(%s::numeric, %s::numeric, %s::numeric) AS n"
+        params = [start, end, step]
+
+    cur.execute(
+        f"""
+        WITH requested AS (
+            SELECT DISTINCT n::numeric(10,2) AS chapter_num FROM ({series}) s
+        ),
+        inserted AS (
+            INSERT INTO chapter (chapter_num, manga_id)
+            SELECT chapter_num, %s FROM requested
+            ON CONFLICT (manga_id, chapter_num) DO NOTHING
+            RETURNING chapter_num
+        )
+        SELECT r.chapter_num, i.chapter_num IS NOT NULL AS inserted
+        FROM requested r
+        LEFT JOIN inserted i ON i.chapter_num = r.chapter_num
+        ORDER BY r.chapter_num
+        """,
+        params + [manga_id],
+    )
+    rows = cur.fetchall()
+    created = [row[0] for row in rows if row[1]]
+    skipped = [row[0] for row in rows if not row[1]]
+
+    translations = 0
+    if language_ids and rows:
+        # Unsupported languages are filtered here rather than left to the
+        # translated_to trigger, which would abort the whole transaction
+        cur.execute(
+            """
+            INSERT INTO translated_to (language_id, chapter_id, translation_date)
+            SELECT s.language_id, c.chapter_id, CURRENT_DATE
+            FROM chapter c
+            JOIN supports s ON s.manga_id = c.manga_id
+            WHERE c.manga_id = %s
+              AND c.chapter_num = ANY(%s::numeric[])
+              AND s.language_id = ANY(%s)
+            ON CONFLICT (language_id, chapter_id) DO NOTHING
+            """,
+            (manga_id, [row[0] for row in rows], list(language_ids)),
+        )
+        translations = cur.rowcount
+    return created, skipped, translations
+
+
+def upsert_tags(cur, names):
+    """Resolve tag names to tags, creating the missing ones in one statement
+
+    Names are matched case-insensitively, both against each other and
+    against existing tags; the first spelling of a new name wins. Returns
+    one ``{"id", "name", "created"}`` dict per distinct name, in input order.
+    """
+    if not names:
+        return []
+
+    cur.execute(
+        """
+        WITH input AS (
+            SELECT DISTINCT ON (LOWER(name)) name, LOWER(name) AS key, ord
+            FROM unnest(%s::text[]) WITH ORDINALITY AS t(name, ord)
+            ORDER BY LOWER(name), ord
+        ),
+        existing AS (
+            SELECT t.tag_id, t.tag_name, LOWER(t.tag_name) AS key
+            FROM tag t
+            WHERE LOWER(t.tag_name) IN (SELECT key FROM input)
+        ),
+        inserted AS (
+            INSERT INTO tag (tag_name)
+            SELECT i.name FROM input i
+            WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.key = i.key)
+            ORDER BY i.ord
+            ON CONFLICT ((LOWER(tag_name))) DO NOTHING
+            RETURNING tag_id, tag_name
+        )
+        SELECT i.key, COALESCE(e.tag_id, n.tag_id), COALESCE(e.tag_name, n.tag_name),
+               n.tag_id IS NOT NULL
+        FROM input i
+        LEFT JOIN existing e ON e.key = i.key
+        LEFT JOIN inserted n ON LOWER(n.tag_name) = i.key
+        ORDER BY i.ord
+        """,
+        (list(names),),
+    )
+    rows = cur.fetchall()
+
+    # A concurrent request may create a name (in any case) between the
+    # lookup and the insert, in which case ON CONFLICT skips it and it has
+    # no id yet
+    missing = [row[0] for row in rows if row[1] is None]
+    found = {}
+    if missing:
+        cur.execute(
+            """
+            SELECT LOWER(tag_name), tag_id, tag_name
+            FROM tag
+            WHERE LOWER(tag_name) = ANY(%s)
+            """,
+            (missing,),
+        )
+        found = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+    tags = []
+    for key, tag_id, tag_name, created in rows:
+        if tag_id is None:
+            tag_id, tag_name = found[key]
+        tags.append({"id": tag_id, "name": tag_name, "created": created})
+    return tags
+
+
+def attach_tags(cur, manga_ids, tag_ids):
+    """Tag every manga in ``manga_ids`` with every tag in ``tag_ids``
+
+    Unknown manga are ignored. Returns the number of new has rows.
+    """
+    if not manga_ids or not tag_ids:
+        return 0
+    cur.execute(
+        """
+        INSERT INTO has (tag_id, manga_id)
+        SELECT t.tag_id, m.manga_id
+        FROM manga m
+        CROSS JOIN unnest(%s::int[]) AS t(tag_id)
+        WHERE m.manga_id = ANY(%s::int[])
+        ON CONFLICT (tag_id, manga_id) DO NOTHING
+        """,
+        (list(tag_ids), list(manga_ids)),
+    )
+    return cur.rowcount
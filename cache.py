@@ -0,0 +1,193 @@
+import collections
+import json
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel the catalog triggers publish change notifications on
+CATALOG_CHANNEL = "catalog_changed"
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL and tag-based invalidation
+
+    Every entry may be stored with a set of tags (for example
+    ``("manga", 42)``); ``invalidate_tag`` drops exactly the entries that
+    were stored with that tag.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = collections.OrderedDict()  # key -> (value, tags, stored_at)
+        self._tags = collections.defaultdict(set)  # tag -> keys
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so readers can detect that an entry
+        # they computed may already be stale before storing it
+        self.generation = 0
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def _remove(self, key):
+        _, tags, _ = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None:
+                if time.monotonic() - entry[2] > self.ttl:
+                    self._remove(key)
+                    entry = _MISSING
+            if entry is _MISSING:
+                self._counters["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def set(self, key, value, tags=(), generation=None):
+        """Store ``value``; skipped if an invalidation happened since ``generation``"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._data:
+                self._remove(key)
+            tags = frozenset(tags)
+            self._data[key] = (value, tags, time.monotonic())
+            for tag in tags:
+                self._tags[tag].add(key)
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            if key in self._data:
+                self._remove(key)
+                self._counters["invalidations"] += 1
+
+    def invalidate_tag(self, tag):
+        """Drop every entry stored with ``tag``"""
+        with self._lock:
+            self.generation += 1
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self._counters["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._counters["invalidations"] += len(self._data)
+            self._data.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, **self._counters}
+
+
+class ChangeListener(threading.Thread):
+    """Background thread that LISTENs for catalog change notifications
+
+    Each decoded JSON payload is passed to ``callback``. The listener uses
+    its own autocommit connection rather than the request pool and
+    reconnects with backoff; ``on_reconnect`` is called after every
+    (re)connect so callers can drop state that may have missed
+    notifications while disconnected.
+    """
+
+    def __init__(self, dsn, callback, on_reconnect=None, channels=(CATALOG_CHANNEL,)):
+        super().__init__(name="catalog-listener", daemon=True)
+        self.dsn = dsn
+        self.callback = callback
+        self.on_reconnect = on_reconnect
+        self.channels = channels
+        self.notifications = 0
+        self.connected = False
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _listen(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            for channel in self.channels:
+                cur.execute(f"LISTEN {channel}")
+        return conn
+
+    def run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = self._listen()
+                backoff = 1
+                if self.on_reconnect:
+                    self.on_reconnect()
+                self.connected = True
+                while not self._stop_event.is_set():
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        # Idle: ping so a silently dropped connection is noticed
+                        with conn.cursor() as cur:
+                            cur.execute("SELECT 1")
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.notifications += 1
+                        self._dispatch(notify)
+            except Exception as e:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+                logger.warning(
+                    f"Catalog listener error, reconnecting in {backoff}s: {e}"
+                )
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _dispatch(self, notify):
+        try:
+            payload = json.loads(notify.payload) if notify.payload else {}
+        except ValueError:
+            logger.warning(f"Ignoring malformed notification: {notify.payload!r}")
+            return
+        payload.setdefault("channel", notify.channel)
+        try:
+            self.callback(payload)
+        except Exception as e:
+            logger.error(f"Catalog change handler error: {e}")
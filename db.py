@@ -0,0 +1,244 @@
+import collections
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available before the pool timeout"""
+
+
+class PooledConnection:
+    """Connection proxy that hands the connection back to its pool on close()
+
+    Used as a context manager it is returned to the pool on exit. Unlike a
+    plain psycopg2 connection, it does not commit when the block exits.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(self._conn, name)
+
+    @property
+    def closed(self):
+        return 1 if self._conn is None else self._conn.closed
+
+    def close(self):
+        """Return the connection to the pool instead of closing it"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.putconn(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe, bounded psycopg2 connection pool
+
+    Connections are validated on checkout: closed or broken connections are
+    discarded, and connections idle for longer than ``validate_after``
+    seconds are pinged before being handed out. When all ``maxconn``
+    connections are in use, callers wait up to ``timeout`` seconds.
+    """
+
+    def __init__(self, dsn, minconn=1, maxconn=10, timeout=5.0, validate_after=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(
+                "pool sizes must satisfy 0 <= minconn <= maxconn, maxconn >= 1"
+            )
+
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+
+        self._idle = collections.deque()  # (connection, returned_at)
+        self._size = 0  # idle + checked out
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        self._counters = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "failures": 0,
+            "discarded": 0,
+            "created": 0,
+        }
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self._counters["created"] += 1
+        return conn
+
+    def _check_pid(self):
+        """Forget connections inherited across fork(); they belong to the parent"""
+        if self._pid != os.getpid():
+            self._idle.clear()
+            self._size = 0
+            self._pid = os.getpid()
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - returned_at < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._counters["discarded"] += 1
+            self._cond.notify()
+
+    def open(self):
+        """Pre-open ``minconn`` connections"""
+        conns = []
+        try:
+            while True:
+                with self._cond:
+                    self._check_pid()
+                    if self._size >= self.minconn:
+                        break
+                    self._size += 1
+                try:
+                    conns.append(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._counters["failures"] += 1
+                    raise
+        finally:
+            now = time.monotonic()
+            with self._cond:
+                self._idle.extend((conn, now) for conn in conns)
+                self._cond.notify_all()
+
+    def getconn(self):
+        """Check out a validated connection, waiting up to ``timeout`` seconds"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                self._check_pid()
+                while True:
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        conn, returned_at = None, None
+                        break
+                    if not waited:
+                        waited = True
+                        self._counters["waits"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"no database connection available after {self.timeout}s"
+                        )
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._counters["failures"] += 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, returned_at):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._counters["checkouts"] += 1
+            return PooledConnection(self, conn)
+
+    def putconn(self, conn):
+        """Return a connection, rolling back any open transaction"""
+        if conn.closed:
+            self._discard(conn)
+            return
+
+        try:
+            if (
+                conn.get_transaction_status()
+                != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            ):
+                conn.rollback()
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """Snapshot of pool size and counters"""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min": self.minconn,
+                "max": self.maxconn,
+                **self._counters,
+            }
+
+
+def create_pool(dsn):
+    """Create a connection pool configured from DB_POOL_* environment variables"""
+    return ConnectionPool(
+        dsn,
+        minconn=int(os.environ.get("DB_POOL_MIN", 1)),
+        maxconn=int(os.environ.get("DB_POOL_MAX", 10)),
+        timeout=float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+        validate_after=float(os.environ.get("DB_POOL_VALIDATE_AFTER", 30)),
+    )
@@ -0,0 +1,184 @@
+"""Chapter archive (CBZ/ZIP) ingest
+
+An uploaded archive is extracted entry by entry into a staging directory
+under the data directory, each extracted file is validated in a thread
+pool while extraction continues, and the accepted images are numbered in
+natural filename order. ``ingest_archive`` is a generator of progress
+events so the admin can report progress while it runs.
+"""
+
+import concurrent.futures
+import logging
+import os
+import secrets
+import shutil
+import threading
+import time
+import zipfile
+
+import magic
+from PIL import Image
+
+from archives import CHUNK_SIZE, IMAGE_TYPES, natural_key
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAX_ENTRIES = int(os.environ.get("ARCHIVE_MAX_ENTRIES", 5000))
+ARCHIVE_MAX_BYTES = int(os.environ.get("ARCHIVE_MAX_BYTES", 2 * 1024**3))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", 4))
+
+_magic = threading.local()
+
+
+class ArchiveError(Exception):
+    """Raised when an uploaded archive cannot be ingested"""
+
+
+def _is_page_entry(info):
+    if info.is_dir():
+        return False
+    parts = info.filename.replace("\\", "/").split("/")
+    # Skip macOS resource forks and hidden files such as .DS_Store
+    return not any(part.startswith(".") or part == "__MACOSX" for part in parts)
+
+
+def sniff_image(path):
+    """Return (extension, None) for a valid image, or (None, reason)"""
+    # libmagic handles are not thread-safe, so each worker thread has its own
+    if not hasattr(_magic, "instance"):
+        _magic.instance = magic.Magic(mime=True)
+    with open(path, "rb") as fh:
+        mime_type = _magic.instance.from_buffer(fh.read(4096))
+    extension = IMAGE_TYPES.get(mime_type)
+    if extension is None:
+        return None, f"not an image ({mime_type})"
+    try:
+        with Image.open(path) as img:
+            img.verify()
+    except Exception as e:
+        return None, f"corrupt {mime_type}: {e}"
+    return extension, None
+
+
+def ingest_archive(fileobj, data_dir, target_dir, insert, store=None):
+    """Extract, validate and register the pages of a chapter archive
+
+    ``target_dir`` is relative to ``data_dir``; pages end up in a fresh
+    batch directory below it (or in ``store``, a ContentStore, if given).
+    ``insert`` receives the list of ``(position, page_path)`` in page order
+    (positions start at 1) and must register them. It returns a summary
+    dict whose ``unused`` entry lists page paths that were not registered;
+    those files are removed, as are all stored files if ``insert`` raises.
+
+    Yields progress dicts with ``stage``, ``message`` and, where it makes
+    sense, ``done``/``total`` counts.
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        raise ArchiveError(f"Not a valid CBZ/ZIP archive: {e}")
+
+    with archive:
+        entries = sorted(
+            (info for info in archive.infolist() if _is_page_entry(info)),
+            key=lambda info: natural_key(info.filename),
+        )
+        if not entries:
+            raise ArchiveError("The archive contains no files")
+        if len(entries) > ARCHIVE_MAX_ENTRIES:
+            raise ArchiveError(
+                f"The archive has {len(entries)} files; the limit is "
+                f"{ARCHIVE_MAX_ENTRIES}"
+            )
+        total_bytes = sum(info.file_size for info in entries)
+        if total_bytes > ARCHIVE_MAX_BYTES:
+            raise ArchiveError(
+                f"The archive expands to {total_bytes} bytes; the limit is "
+                f"{ARCHIVE_MAX_BYTES}"
+            )
+
+        staging = os.path.join(
+            data_dir, ".cache", "uploads", f"{time.time_ns()}-{secrets.token_hex(4)}"
+        )
+        os.makedirs(staging)
+        stored = []
+        batch_dir = None
+        try:
+            yield {
+                "stage": "extract",
+                "message": f"Extracting {len(entries)} files",
+                "done": 0,
+                "total": len(entries),
+            }
+
+            # Extraction is sequential; validation of each file overlaps
+            # with extracting the next ones
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=INGEST_WORKERS
+            ) as executor:
+                futures = []
+                for index, info in enumerate(entries):
+                    staged = os.path.join(staging, f"{index:05d}")
+                    with archive.open(info) as src, open(staged, "wb") as dest:
+                        shutil.copyfileobj(src, dest, CHUNK_SIZE)
+                    futures.append(executor.submit(sniff_image, staged))
+                    if (index + 1) % 25 == 0 or index + 1 == len(entries):
+                        yield {
+                            "stage": "extract",
+                            "message": f"Extracted {index + 1} of {len(entries)}",
+                            "done": index + 1,
+                            "total": len(entries),
+                        }
+
+                accepted = []
+                rejected = []
+                for index, (info, future) in enumerate(zip(entries, futures)):
+                    extension, reason = future.result()
+                    if extension:
+                        accepted.append((index, extension))
+                    else:
+                        rejected.append(f"{info.filename}: {reason}")
+
+            yield {
+                "stage": "validate",
+                "message": f"{len(accepted)} images accepted, {len(rejected)} rejected",
+                "done": len(accepted),
+                "total": len(entries),
+                "rejected": rejected,
+            }
+            if not accepted:
+                raise ArchiveError("The archive contains no valid images")
+
+            batch = f"{time.strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(3)}"
+            batch_dir = f"{target_dir}/{batch}"
+            os.makedirs(os.path.join(data_dir, batch_dir), exist_ok=True)
+            pages = []
+            for position, (index, extension) in enumerate(accepted, start=1):
+                staged = os.path.join(staging, f"{index:05d}")
+                page_path = f"{batch_dir}/{position:04d}{extension}"
+                os.replace(staged, os.path.join(data_dir, page_path))
+                if store is not None:
+                    object_path = store.put(page_path)
+                    os.unlink(os.path.join(data_dir, page_path))
+                    page_path = object_path
+                else:
+                    stored.append(page_path)
+                pages.append((position, page_path))
+
+            yield {"stage": "insert", "message": f"Registering {len(pages)} pages"}
+            summary = insert(pages)
+            unused = set(summary.pop("unused", ()))
+            stored = [page_path for page_path in stored if page_path in unused]
+            yield {"stage": "done", "message": "Upload complete", **summary}
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+            for page_path in stored:
+                try:
+                    os.unlink(os.path.join(data_dir, page_path))
+                except OSError:
+                    pass
+            if batch_dir is not None:
+                try:
+                    os.rmdir(os.path.join(data_dir, batch_dir))  # only if empty
+                except OSError:
+                    pass
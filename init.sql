@@ -1,3 +1,6 @@
+-- Extensions
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create custom types
 CREATE TYPE STATUS AS ENUM ('ongoing', 'completed', 'hiatus', 'cancelled', 'unknown');
 
@@ -30,7 +33,8 @@ CREATE TABLE CHAPTER (
 
 CREATE TABLE AUTHOR (
     author_id SERIAL PRIMARY KEY,
-    name_romanized VARCHAR(200) NOT NULL
+    name_romanized VARCHAR(200) NOT NULL,
+    manga_count INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE PAGES (
@@ -45,7 +49,8 @@ CREATE TABLE PAGES (
 
 CREATE TABLE tag (
     tag_id SERIAL PRIMARY KEY,
-    tag_name VARCHAR(100) NOT NULL UNIQUE
+    tag_name VARCHAR(100) NOT NULL UNIQUE,
+    manga_count INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE LANGUAGE (
@@ -187,6 +192,29 @@ CREATE INDEX idx_has_manga ON has(manga_id);
 CREATE INDEX idx_supports_manga ON supports(manga_id);
 CREATE INDEX idx_translated_chapter ON translated_to(chapter_id);
 
+-- Trigram search over all title columns and tag names
+CREATE OR REPLACE FUNCTION manga_search_text(name_english TEXT, name_romanized TEXT, name_original TEXT)
+RETURNS TEXT AS $$
+    SELECT LOWER(COALESCE(name_english, '') || ' ' || COALESCE(name_romanized, '') || ' ' || COALESCE(name_original, ''))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE INDEX idx_manga_search_trgm ON MANGA
+    USING GIN (manga_search_text(name_english, name_romanized, name_original) gin_trgm_ops);
+CREATE INDEX idx_tag_name_trgm ON tag USING GIN (LOWER(tag_name) gin_trgm_ops);
+CREATE INDEX idx_author_name_trgm ON AUTHOR USING GIN (LOWER(name_romanized) gin_trgm_ops);
+-- Tag names are unique regardless of case; also serves case-insensitive
+-- lookups and the ON CONFLICT target of the bulk tag upsert
+CREATE UNIQUE INDEX idx_tag_name_lower ON tag (LOWER(tag_name));
+
+-- Keyset pagination over manga titles
+CREATE INDEX idx_manga_title_key
+    ON MANGA ((COALESCE(name_english, name_romanized, name_original, '')), manga_id);
+
+-- Keyset pagination of the admin tag and author lists (tag names are unique)
+CREATE INDEX idx_tag_usage ON tag (manga_count, tag_id);
+CREATE INDEX idx_author_name_key ON AUTHOR (name_romanized, author_id);
+CREATE INDEX idx_author_usage ON AUTHOR (manga_count, author_id);
+
 -- Trigger for updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -201,6 +229,792 @@ CREATE TRIGGER update_manga_updated_at
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Denormalized manga card read model used by the public gallery and search
+CREATE TABLE manga_card (
+    manga_id INTEGER PRIMARY KEY REFERENCES MANGA (manga_id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    status STATUS NOT NULL DEFAULT 'unknown',
+    publish_date DATE,
+    ended_date DATE,
+    created_at TIMESTAMP WITH TIME ZONE,
+    last_activity_at TIMESTAMP WITH TIME ZONE,
+    cover_path VARCHAR(4096),
+    tags TEXT[] NOT NULL DEFAULT '{}',
+    languages TEXT[] NOT NULL DEFAULT '{}',
+    language_keys TEXT[] NOT NULL DEFAULT '{}',
+    search_text TEXT NOT NULL DEFAULT ''
+);
+
+CREATE INDEX idx_manga_card_title ON manga_card (title, manga_id);
+CREATE INDEX idx_manga_card_newest
+    ON manga_card ((COALESCE(publish_date, '-infinity'::date)), manga_id);
+CREATE INDEX idx_manga_card_oldest
+    ON manga_card ((COALESCE(publish_date, 'infinity'::date)), manga_id);
+CREATE INDEX idx_manga_card_status_title ON manga_card (status, title, manga_id);
+CREATE INDEX idx_manga_card_created ON manga_card (created_at, manga_id);
+CREATE INDEX idx_manga_card_activity
+    ON manga_card (last_activity_at DESC NULLS LAST, manga_id DESC);
+CREATE INDEX idx_manga_card_completed ON manga_card ((COALESCE(ended_date, '-infinity'::date)), manga_id)
+    WHERE status = 'completed';
+CREATE INDEX idx_manga_card_language_keys ON manga_card USING GIN (language_keys);
+CREATE INDEX idx_manga_card_search_trgm ON manga_card USING GIN (search_text gin_trgm_ops);
+
+-- Rebuild the cards of the given manga from the normalized tables
+CREATE OR REPLACE FUNCTION refresh_manga_cards(ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO manga_card (manga_id, title, status, publish_date, ended_date,
+                            created_at, last_activity_at, cover_path, tags, languages,
+                            language_keys, search_text)
+    SELECT
+        m.manga_id,
+        COALESCE(m.name_english, m.name_romanized, m.name_original, ''),
+        COALESCE(m.manga_status, 'unknown'),
+        m.started_publishing,
+        m.ended_publishing,
+        m.created_at,
+        GREATEST(m.created_at, act.last_chapter_at, act.last_translation_at),
+        m.cover_path,
+        COALESCE(tg.tags, '{}'),
+        COALESCE(lg.languages, '{}'),
+        COALESCE(lg.language_keys, '{}'),
+        manga_search_text(m.name_english, m.name_romanized, m.name_original)
+            || ' ' || LOWER(COALESCE(array_to_string(tg.tags, ' '), ''))
+    FROM manga m
+    -- Each part is aggregated once for the whole id set; per-manga lateral
+    -- lookups fall apart when a bulk import refreshes thousands of cards
+    -- against link tables the planner has no statistics for yet
+    LEFT JOIN (
+        SELECT h.manga_id, ARRAY_AGG(t.tag_name ORDER BY t.tag_name) AS tags
+        FROM has h
+        JOIN tag t ON h.tag_id = t.tag_id
+        WHERE h.manga_id = ANY(ids)
+        GROUP BY h.manga_id
+    ) tg ON tg.manga_id = m.manga_id
+    LEFT JOIN (
+        SELECT s.manga_id,
+               ARRAY_AGG(l.language_name_en ORDER BY l.language_name_en) AS languages,
+               ARRAY_AGG(LOWER(l.language_name_en) ORDER BY l.language_name_en) AS language_keys
+        FROM supports s
+        JOIN language l ON s.language_id = l.language_id
+        WHERE s.manga_id = ANY(ids)
+        GROUP BY s.manga_id
+    ) lg ON lg.manga_id = m.manga_id
+    LEFT JOIN (
+        SELECT c.manga_id,
+               MAX(c.created_at) AS last_chapter_at,
+               MAX(tt.translation_date)::timestamptz AS last_translation_at
+        FROM chapter c
+        LEFT JOIN translated_to tt ON tt.chapter_id = c.chapter_id
+        WHERE c.manga_id = ANY(ids)
+        GROUP BY c.manga_id
+    ) act ON act.manga_id = m.manga_id
+    WHERE m.manga_id = ANY(ids)
+    ON CONFLICT (manga_id) DO UPDATE SET
+        title = EXCLUDED.title,
+        status = EXCLUDED.status,
+        publish_date = EXCLUDED.publish_date,
+        ended_date = EXCLUDED.ended_date,
+        created_at = EXCLUDED.created_at,
+        last_activity_at = EXCLUDED.last_activity_at,
+        cover_path = EXCLUDED.cover_path,
+        tags = EXCLUDED.tags,
+        languages = EXCLUDED.languages,
+        language_keys = EXCLUDED.language_keys,
+        search_text = EXCLUDED.search_text;
+
+    PERFORM notify_catalog_change('card', ids);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level triggers: one refresh per statement, not per row
+CREATE OR REPLACE FUNCTION manga_card_refresh_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(SELECT DISTINCT manga_id FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_refresh_moved_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(
+        SELECT manga_id FROM old_rows UNION SELECT manga_id FROM changed_rows
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only renamed tags change cards; usage count updates do not
+CREATE OR REPLACE FUNCTION manga_card_refresh_tags()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(
+        SELECT DISTINCT h.manga_id
+        FROM changed_rows c
+        JOIN old_rows o ON o.tag_id = c.tag_id
+        JOIN has h ON h.tag_id = c.tag_id
+        WHERE c.tag_name IS DISTINCT FROM o.tag_name
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_refresh_languages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(
+        SELECT DISTINCT s.manga_id FROM supports s JOIN changed_rows c ON s.language_id = c.language_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER manga_card_manga_insert
+    AFTER INSERT ON MANGA REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+CREATE TRIGGER manga_card_manga_update
+    AFTER UPDATE ON MANGA REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+
+CREATE TRIGGER manga_card_has_insert
+    AFTER INSERT ON has REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+CREATE TRIGGER manga_card_has_update
+    AFTER UPDATE ON has REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_moved_rows();
+CREATE TRIGGER manga_card_has_delete
+    AFTER DELETE ON has REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+
+CREATE TRIGGER manga_card_supports_insert
+    AFTER INSERT ON supports REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+CREATE TRIGGER manga_card_supports_update
+    AFTER UPDATE ON supports REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_moved_rows();
+CREATE TRIGGER manga_card_supports_delete
+    AFTER DELETE ON supports REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+
+CREATE TRIGGER manga_card_tag_update
+    AFTER UPDATE ON tag REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_tags();
+
+CREATE TRIGGER manga_card_language_update
+    AFTER UPDATE ON LANGUAGE REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_languages();
+
+-- Last activity: new chapters and translations move a manga's
+-- last_activity_at forward without rebuilding its card. Activity only ever
+-- moves forward here; refresh_manga_cards recomputes it from scratch.
+CREATE OR REPLACE FUNCTION bump_manga_activity(ids INTEGER[], stamps TIMESTAMP WITH TIME ZONE[])
+RETURNS VOID AS $$
+DECLARE
+    touched INTEGER[];
+BEGIN
+    WITH activity AS (
+        SELECT a.manga_id, MAX(a.at) AS at
+        FROM unnest(ids, stamps) AS a(manga_id, at)
+        GROUP BY a.manga_id
+    ), updated AS (
+        UPDATE manga_card mc
+        SET last_activity_at = activity.at
+        FROM activity
+        WHERE mc.manga_id = activity.manga_id
+          AND (mc.last_activity_at IS NULL OR mc.last_activity_at < activity.at)
+        RETURNING mc.manga_id
+    )
+    SELECT ARRAY_AGG(manga_id) INTO touched FROM updated;
+
+    PERFORM notify_catalog_change('card', touched);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_chapter_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_manga_activity(ids, stamps)
+    FROM (
+        SELECT ARRAY_AGG(manga_id) AS ids,
+               ARRAY_AGG(COALESCE(created_at, now())) AS stamps
+        FROM changed_rows
+    ) a;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_translation_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_manga_activity(ids, stamps)
+    FROM (
+        SELECT ARRAY_AGG(c.manga_id) AS ids,
+               ARRAY_AGG(COALESCE(r.translation_date::timestamptz, now())) AS stamps
+        FROM changed_rows r
+        JOIN chapter c ON c.chapter_id = r.chapter_id
+    ) a;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER manga_card_chapter_activity
+    AFTER INSERT ON CHAPTER REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_chapter_activity();
+CREATE TRIGGER manga_card_translated_to_insert_activity
+    AFTER INSERT ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_translation_activity();
+CREATE TRIGGER manga_card_translated_to_update_activity
+    AFTER UPDATE ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_translation_activity();
+
+-- Catalog change notifications (channel catalog_changed) for web worker caches
+-- Payload: {"scope": "card"|"detail", "manga_ids": [...]} or, when too many
+-- manga changed to fit in a notification, {"scope": ..., "all": true}.
+-- "card" changes affect gallery listings; "detail" changes only affect the
+-- manga's own detail page.
+CREATE OR REPLACE FUNCTION notify_catalog_change(scope TEXT, ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    IF ids IS NULL OR cardinality(ids) = 0 THEN
+        RETURN;
+    END IF;
+    IF cardinality(ids) > 500 THEN
+        PERFORM pg_notify('catalog_changed', json_build_object('scope', scope, 'all', TRUE)::text);
+    ELSE
+        PERFORM pg_notify('catalog_changed', json_build_object('scope', scope, 'manga_ids', ids)::text);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger helpers; the scope is passed as the trigger argument
+CREATE OR REPLACE FUNCTION catalog_notify_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_catalog_change(TG_ARGV[0], ARRAY(SELECT DISTINCT manga_id FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_notify_translations()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_catalog_change(TG_ARGV[0], ARRAY(
+        SELECT DISTINCT c.manga_id FROM chapter c JOIN changed_rows r ON c.chapter_id = r.chapter_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only renamed authors are announced; usage count updates are not
+CREATE OR REPLACE FUNCTION catalog_notify_authors()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_catalog_change(TG_ARGV[0], ARRAY(
+        SELECT DISTINCT w.manga_id
+        FROM changed_rows r
+        JOIN old_rows o ON o.author_id = r.author_id
+        JOIN writes w ON w.author_id = r.author_id
+        WHERE r.name_romanized IS DISTINCT FROM o.name_romanized
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_notify_manga_delete
+    AFTER DELETE ON MANGA REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('card');
+
+CREATE TRIGGER catalog_notify_chapter_insert
+    AFTER INSERT ON CHAPTER REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+CREATE TRIGGER catalog_notify_chapter_update
+    AFTER UPDATE ON CHAPTER REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+CREATE TRIGGER catalog_notify_chapter_delete
+    AFTER DELETE ON CHAPTER REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+
+CREATE TRIGGER catalog_notify_translated_to_insert
+    AFTER INSERT ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_translations('detail');
+CREATE TRIGGER catalog_notify_translated_to_update
+    AFTER UPDATE ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_translations('detail');
+CREATE TRIGGER catalog_notify_translated_to_delete
+    AFTER DELETE ON translated_to REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_translations('detail');
+
+CREATE TRIGGER catalog_notify_writes_insert
+    AFTER INSERT ON writes REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+CREATE TRIGGER catalog_notify_writes_delete
+    AFTER DELETE ON writes REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+
+CREATE TRIGGER catalog_notify_author_update
+    AFTER UPDATE ON AUTHOR REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_authors('detail');
+
+-- Page changes, for the web workers' page path caches. Payload:
+-- {"scope": "pages", "chapter_ids": [...]} or {"scope": "pages", "all": true}
+CREATE OR REPLACE FUNCTION notify_pages_change(ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    IF ids IS NULL OR cardinality(ids) = 0 THEN
+        RETURN;
+    END IF;
+    IF cardinality(ids) > 500 THEN
+        PERFORM pg_notify('catalog_changed', json_build_object('scope', 'pages', 'all', TRUE)::text);
+    ELSE
+        PERFORM pg_notify('catalog_changed', json_build_object('scope', 'pages', 'chapter_ids', ids)::text);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_notify_pages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_pages_change(ARRAY(SELECT DISTINCT chapter_id FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_notify_moved_pages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_pages_change(ARRAY(
+        SELECT chapter_id FROM old_rows UNION SELECT chapter_id FROM changed_rows
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_notify_pages_insert
+    AFTER INSERT ON PAGES REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_pages();
+CREATE TRIGGER catalog_notify_pages_update
+    AFTER UPDATE ON PAGES REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_moved_pages();
+CREATE TRIGGER catalog_notify_pages_delete
+    AFTER DELETE ON PAGES REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_pages();
+
+-- Chapter directories registered by the library scanner (scanner.py), with
+-- the directory mtime seen at the last scan so unchanged ones are skipped
+CREATE TABLE library_scan_state (
+    dir_path TEXT PRIMARY KEY,
+    mtime_ns BIGINT NOT NULL,
+    chapter_id INTEGER NOT NULL REFERENCES CHAPTER (chapter_id) ON DELETE CASCADE,
+    language_id VARCHAR(10) NOT NULL REFERENCES LANGUAGE (language_id) ON DELETE CASCADE,
+    page_count INTEGER NOT NULL DEFAULT 0,
+    scanned_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX idx_library_scan_state_chapter ON library_scan_state (chapter_id);
+
+-- Background jobs (jobs.py); workers claim queued rows with SKIP LOCKED
+CREATE TABLE job (
+    job_id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    label TEXT,
+    params JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    message TEXT,
+    result JSONB,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    return_url TEXT,
+    locked_by TEXT,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX idx_job_queue ON job (run_after, job_id) WHERE status = 'queued';
+CREATE INDEX idx_job_running ON job (heartbeat_at) WHERE status = 'running';
+CREATE INDEX idx_job_created ON job (created_at DESC);
+
+-- Dashboard counters, kept current by statement-level triggers so the admin
+-- dashboard never counts the big tables. scope is '' for table totals and
+-- the language_id for per-language page counts. Triggers only append delta
+-- rows, so writers never queue on a shared counter row; a stat is the sum
+-- of its rows, and compact_catalog_stats() folds them back together.
+CREATE TABLE catalog_stats (
+    stat TEXT NOT NULL,
+    scope TEXT NOT NULL DEFAULT '',
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION add_catalog_stats(stats TEXT[], scopes TEXT[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO catalog_stats (stat, scope, value)
+    SELECT d.stat, d.scope, SUM(d.delta)
+    FROM unnest(stats, scopes, deltas) AS d(stat, scope, delta)
+    GROUP BY d.stat, d.scope
+    HAVING SUM(d.delta) <> 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fold the delta rows into one row per stat; run periodically by the job
+-- worker. Rows of transactions still in flight are not visible here and are
+-- left for the next run. The table lock only keeps compaction, TRUNCATE and
+-- rebuilds apart; trigger inserts do not wait for it.
+CREATE OR REPLACE FUNCTION compact_catalog_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE catalog_stats IN SHARE UPDATE EXCLUSIVE MODE;
+    WITH folded AS (
+        DELETE FROM catalog_stats RETURNING stat, scope, value
+    )
+    INSERT INTO catalog_stats (stat, scope, value)
+    SELECT stat, scope, SUM(value)::BIGINT
+    FROM folded
+    GROUP BY stat, scope
+    HAVING SUM(value) <> 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row counts; the stat name is passed as the trigger argument
+CREATE OR REPLACE FUNCTION catalog_stats_count_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_catalog_stats(
+        ARRAY[TG_ARGV[0]], ARRAY[''],
+        ARRAY[(SELECT CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END FROM changed_rows)]
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Page counts per language, and how many chapters have pages at all. A
+-- chapter counts from its first page until its last one is gone; its page
+-- count before the statement is its count now minus the change. Writers of
+-- the same chapter take turns, so the count also sees pages committed by
+-- the one before; otherwise two first pages would both count the chapter.
+CREATE OR REPLACE FUNCTION add_page_stats(chapter_ids INTEGER[], language_ids TEXT[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('chapters_with_pages'), c.chapter_id)
+    FROM (SELECT DISTINCT unnest(chapter_ids) AS chapter_id ORDER BY 1) c;
+    PERFORM add_catalog_stats(ARRAY_AGG(s.stat), ARRAY_AGG(s.scope), ARRAY_AGG(s.delta::BIGINT))
+    FROM (
+        SELECT 'pages' AS stat, d.language_id AS scope, SUM(d.delta) AS delta
+        FROM unnest(language_ids, deltas) AS d(language_id, delta)
+        GROUP BY d.language_id
+        UNION ALL
+        SELECT 'chapters_with_pages', '', SUM((c.now > 0)::INTEGER - (c.now - c.delta > 0)::INTEGER)
+        FROM (
+            SELECT d.chapter_id, SUM(d.delta) AS delta,
+                   (SELECT COUNT(*) FROM pages p WHERE p.chapter_id = d.chapter_id) AS now
+            FROM unnest(chapter_ids, deltas) AS d(chapter_id, delta)
+            GROUP BY d.chapter_id
+        ) c
+    ) s;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_stats_pages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_page_stats(ARRAY_AGG(r.chapter_id), ARRAY_AGG(r.language_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT chapter_id, language_id,
+               CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END AS delta
+        FROM changed_rows
+        GROUP BY chapter_id, language_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only pages moved to another chapter or language change the counters
+CREATE OR REPLACE FUNCTION catalog_stats_moved_pages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_page_stats(ARRAY_AGG(r.chapter_id), ARRAY_AGG(r.language_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT m.chapter_id, m.language_id, SUM(m.delta) AS delta
+        FROM old_rows o
+        JOIN changed_rows n ON n.page_id = o.page_id
+        CROSS JOIN LATERAL (
+            VALUES (o.chapter_id, o.language_id, -1), (n.chapter_id, n.language_id, 1)
+        ) AS m(chapter_id, language_id, delta)
+        WHERE (o.chapter_id, o.language_id) IS DISTINCT FROM (n.chapter_id, n.language_id)
+        GROUP BY m.chapter_id, m.language_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Chapters with at least one translation, serialized per chapter like
+-- add_page_stats
+CREATE OR REPLACE FUNCTION add_translation_stats(chapter_ids INTEGER[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('translated_chapters'), c.chapter_id)
+    FROM (SELECT DISTINCT unnest(chapter_ids) AS chapter_id ORDER BY 1) c;
+    PERFORM add_catalog_stats(ARRAY['translated_chapters'], ARRAY[''], ARRAY[
+        SUM((c.now > 0)::INTEGER - (c.now - c.delta > 0)::INTEGER)
+    ])
+    FROM (
+        SELECT d.chapter_id, SUM(d.delta) AS delta,
+               (SELECT COUNT(*) FROM translated_to t WHERE t.chapter_id = d.chapter_id) AS now
+        FROM unnest(chapter_ids, deltas) AS d(chapter_id, delta)
+        GROUP BY d.chapter_id
+    ) c;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_stats_translations()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_translation_stats(ARRAY_AGG(r.chapter_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT chapter_id, CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END AS delta
+        FROM changed_rows
+        GROUP BY chapter_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_stats_moved_translations()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_translation_stats(ARRAY_AGG(r.chapter_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT chapter_id, SUM(delta) AS delta
+        FROM (
+            SELECT chapter_id, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT chapter_id, 1 FROM changed_rows
+        ) m
+        GROUP BY chapter_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE drops the listed stats; missing stats read as zero
+CREATE OR REPLACE FUNCTION catalog_stats_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+    LOCK TABLE catalog_stats IN SHARE UPDATE EXCLUSIVE MODE;
+    DELETE FROM catalog_stats WHERE stat = ANY(TG_ARGV);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recount everything, e.g. after loading data with triggers disabled
+CREATE OR REPLACE FUNCTION rebuild_catalog_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE manga, chapter, author, tag, pages, translated_to IN SHARE MODE;
+    LOCK TABLE catalog_stats IN SHARE UPDATE EXCLUSIVE MODE;
+    DELETE FROM catalog_stats;
+    INSERT INTO catalog_stats (stat, scope, value)
+    SELECT 'manga', '', COUNT(*) FROM manga
+    UNION ALL SELECT 'chapters', '', COUNT(*) FROM chapter
+    UNION ALL SELECT 'authors', '', COUNT(*) FROM author
+    UNION ALL SELECT 'tags', '', COUNT(*) FROM tag
+    UNION ALL SELECT 'pages', language_id, COUNT(*) FROM pages GROUP BY language_id
+    UNION ALL SELECT 'chapters_with_pages', '', COUNT(DISTINCT chapter_id) FROM pages
+    UNION ALL SELECT 'translated_chapters', '', COUNT(DISTINCT chapter_id) FROM translated_to;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_stats_manga_insert
+    AFTER INSERT ON MANGA REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('manga');
+CREATE TRIGGER catalog_stats_manga_delete
+    AFTER DELETE ON MANGA REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('manga');
+CREATE TRIGGER catalog_stats_manga_truncate
+    AFTER TRUNCATE ON MANGA
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('manga');
+
+CREATE TRIGGER catalog_stats_chapter_insert
+    AFTER INSERT ON CHAPTER REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('chapters');
+CREATE TRIGGER catalog_stats_chapter_delete
+    AFTER DELETE ON CHAPTER REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('chapters');
+CREATE TRIGGER catalog_stats_chapter_truncate
+    AFTER TRUNCATE ON CHAPTER
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('chapters');
+
+CREATE TRIGGER catalog_stats_author_insert
+    AFTER INSERT ON AUTHOR REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('authors');
+CREATE TRIGGER catalog_stats_author_delete
+    AFTER DELETE ON AUTHOR REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('authors');
+CREATE TRIGGER catalog_stats_author_truncate
+    AFTER TRUNCATE ON AUTHOR
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('authors');
+
+CREATE TRIGGER catalog_stats_tag_insert
+    AFTER INSERT ON tag REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('tags');
+CREATE TRIGGER catalog_stats_tag_delete
+    AFTER DELETE ON tag REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('tags');
+CREATE TRIGGER catalog_stats_tag_truncate
+    AFTER TRUNCATE ON tag
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('tags');
+
+CREATE TRIGGER catalog_stats_pages_insert
+    AFTER INSERT ON PAGES REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_pages();
+CREATE TRIGGER catalog_stats_pages_update
+    AFTER UPDATE ON PAGES REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_moved_pages();
+CREATE TRIGGER catalog_stats_pages_delete
+    AFTER DELETE ON PAGES REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_pages();
+CREATE TRIGGER catalog_stats_pages_truncate
+    AFTER TRUNCATE ON PAGES
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('pages', 'chapters_with_pages');
+
+CREATE TRIGGER catalog_stats_translated_to_insert
+    AFTER INSERT ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_translations();
+CREATE TRIGGER catalog_stats_translated_to_update
+    AFTER UPDATE ON translated_to REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_moved_translations();
+CREATE TRIGGER catalog_stats_translated_to_delete
+    AFTER DELETE ON translated_to REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_translations();
+CREATE TRIGGER catalog_stats_translated_to_truncate
+    AFTER TRUNCATE ON translated_to
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('translated_chapters');
+
+-- Usage counts: tag.manga_count and author.manga_count follow the rows in
+-- has and writes, so the admin lists can sort by them without counting
+CREATE OR REPLACE FUNCTION add_tag_usage(tag_ids INTEGER[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    -- Locked in id order, so concurrent statements cannot deadlock
+    PERFORM 1 FROM tag WHERE tag_id = ANY(tag_ids) ORDER BY tag_id FOR NO KEY UPDATE;
+    UPDATE tag t SET manga_count = t.manga_count + d.delta
+    FROM (
+        SELECT d.tag_id, SUM(d.delta) AS delta
+        FROM unnest(tag_ids, deltas) AS d(tag_id, delta)
+        GROUP BY d.tag_id
+    ) d
+    WHERE t.tag_id = d.tag_id AND d.delta <> 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION add_author_usage(author_ids INTEGER[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM 1 FROM author WHERE author_id = ANY(author_ids) ORDER BY author_id FOR NO KEY UPDATE;
+    UPDATE author a SET manga_count = a.manga_count + d.delta
+    FROM (
+        SELECT d.author_id, SUM(d.delta) AS delta
+        FROM unnest(author_ids, deltas) AS d(author_id, delta)
+        GROUP BY d.author_id
+    ) d
+    WHERE a.author_id = d.author_id AND d.delta <> 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tag_usage_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_tag_usage(ARRAY_AGG(r.tag_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT tag_id, CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END AS delta
+        FROM changed_rows
+        GROUP BY tag_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tag_usage_moved_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_tag_usage(ARRAY_AGG(r.tag_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT tag_id, -1::BIGINT AS delta FROM old_rows
+        UNION ALL
+        SELECT tag_id, 1 FROM changed_rows
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION author_usage_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_author_usage(ARRAY_AGG(r.author_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT author_id, CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END AS delta
+        FROM changed_rows
+        GROUP BY author_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION author_usage_moved_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_author_usage(ARRAY_AGG(r.author_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT author_id, -1::BIGINT AS delta FROM old_rows
+        UNION ALL
+        SELECT author_id, 1 FROM changed_rows
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE of has or writes; the counted table is the trigger argument
+CREATE OR REPLACE FUNCTION usage_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format('UPDATE %I SET manga_count = 0 WHERE manga_count <> 0', TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tag_usage_has_insert
+    AFTER INSERT ON has REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_rows();
+CREATE TRIGGER tag_usage_has_update
+    AFTER UPDATE ON has REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_moved_rows();
+CREATE TRIGGER tag_usage_has_delete
+    AFTER DELETE ON has REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_rows();
+CREATE TRIGGER tag_usage_has_truncate
+    AFTER TRUNCATE ON has
+    FOR EACH STATEMENT EXECUTE FUNCTION usage_truncate('tag');
+
+CREATE TRIGGER author_usage_writes_insert
+    AFTER INSERT ON writes REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION author_usage_rows();
+CREATE TRIGGER author_usage_writes_update
+    AFTER UPDATE ON writes REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION author_usage_moved_rows();
+CREATE TRIGGER author_usage_writes_delete
+    AFTER DELETE ON writes REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION author_usage_rows();
+CREATE TRIGGER author_usage_writes_truncate
+    AFTER TRUNCATE ON writes
+    FOR EACH STATEMENT EXECUTE FUNCTION usage_truncate('author');
+
 -- Insert common languages
 INSERT INTO LANGUAGE (language_id, language_name_en) VALUES 
     ('en', 'English'),
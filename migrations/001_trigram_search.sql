@@ -0,0 +1,15 @@
+-- Trigram search indexes for manga titles and tag names.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/001_trigram_search.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Normalized text of all three title columns, shared by the index and the queries
+CREATE OR REPLACE FUNCTION manga_search_text(name_english TEXT, name_romanized TEXT, name_original TEXT)
+RETURNS TEXT AS $$
+    SELECT LOWER(COALESCE(name_english, '') || ' ' || COALESCE(name_romanized, '') || ' ' || COALESCE(name_original, ''))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE INDEX IF NOT EXISTS idx_manga_search_trgm ON MANGA
+    USING GIN (manga_search_text(name_english, name_romanized, name_original) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_tag_name_trgm ON tag USING GIN (LOWER(tag_name) gin_trgm_ops);
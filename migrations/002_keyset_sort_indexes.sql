@@ -0,0 +1,10 @@
+-- Indexes backing keyset pagination of the gallery sort orders.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/002_keyset_sort_indexes.sql
+
+CREATE INDEX IF NOT EXISTS idx_manga_title_key
+    ON MANGA ((COALESCE(name_english, name_romanized, name_original, '')), manga_id);
+CREATE INDEX IF NOT EXISTS idx_manga_published_newest
+    ON MANGA ((COALESCE(started_publishing, '-infinity'::date)), manga_id);
+CREATE INDEX IF NOT EXISTS idx_manga_published_oldest
+    ON MANGA ((COALESCE(started_publishing, 'infinity'::date)), manga_id);
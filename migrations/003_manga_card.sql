@@ -0,0 +1,159 @@
+-- Denormalized manga card read model used by the public gallery and search.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/003_manga_card.sql
+
+CREATE TABLE IF NOT EXISTS manga_card (
+    manga_id INTEGER PRIMARY KEY REFERENCES MANGA (manga_id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    status STATUS NOT NULL DEFAULT 'unknown',
+    publish_date DATE,
+    cover_path VARCHAR(4096),
+    tags TEXT[] NOT NULL DEFAULT '{}',
+    languages TEXT[] NOT NULL DEFAULT '{}',
+    language_keys TEXT[] NOT NULL DEFAULT '{}',
+    search_text TEXT NOT NULL DEFAULT ''
+);
+
+CREATE INDEX IF NOT EXISTS idx_manga_card_title ON manga_card (title, manga_id);
+CREATE INDEX IF NOT EXISTS idx_manga_card_newest
+    ON manga_card ((COALESCE(publish_date, '-infinity'::date)), manga_id);
+CREATE INDEX IF NOT EXISTS idx_manga_card_oldest
+    ON manga_card ((COALESCE(publish_date, 'infinity'::date)), manga_id);
+CREATE INDEX IF NOT EXISTS idx_manga_card_status ON manga_card (status);
+CREATE INDEX IF NOT EXISTS idx_manga_card_language_keys ON manga_card USING GIN (language_keys);
+CREATE INDEX IF NOT EXISTS idx_manga_card_search_trgm ON manga_card USING GIN (search_text gin_trgm_ops);
+
+-- The gallery sorts are now served by manga_card
+DROP INDEX IF EXISTS idx_manga_published_newest;
+DROP INDEX IF EXISTS idx_manga_published_oldest;
+
+-- Rebuild the cards of the given manga from the normalized tables
+CREATE OR REPLACE FUNCTION refresh_manga_cards(ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO manga_card (manga_id, title, status, publish_date, cover_path,
+                            tags, languages, language_keys, search_text)
+    SELECT
+        m.manga_id,
+        COALESCE(m.name_english, m.name_romanized, m.name_original, ''),
+        COALESCE(m.manga_status, 'unknown'),
+        m.started_publishing,
+        m.cover_path,
+        COALESCE(tg.tags, '{}'),
+        COALESCE(lg.languages, '{}'),
+        COALESCE(lg.language_keys, '{}'),
+        manga_search_text(m.name_english, m.name_romanized, m.name_original)
+            || ' ' || LOWER(COALESCE(array_to_string(tg.tags, ' '), ''))
+    FROM manga m
+    LEFT JOIN LATERAL (
+        SELECT ARRAY_AGG(t.tag_name ORDER BY t.tag_name) AS tags
+        FROM has h
+        JOIN tag t ON h.tag_id = t.tag_id
+        WHERE h.manga_id = m.manga_id
+    ) tg ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT ARRAY_AGG(l.language_name_en ORDER BY l.language_name_en) AS languages,
+               ARRAY_AGG(LOWER(l.language_name_en) ORDER BY l.language_name_en) AS language_keys
+        FROM supports s
+        JOIN language l ON s.language_id = l.language_id
+        WHERE s.manga_id = m.manga_id
+    ) lg ON TRUE
+    WHERE m.manga_id = ANY(ids)
+    ON CONFLICT (manga_id) DO UPDATE SET
+        title = EXCLUDED.title,
+        status = EXCLUDED.status,
+        publish_date = EXCLUDED.publish_date,
+        cover_path = EXCLUDED.cover_path,
+        tags = EXCLUDED.tags,
+        languages = EXCLUDED.languages,
+        language_keys = EXCLUDED.language_keys,
+        search_text = EXCLUDED.search_text;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level triggers: one refresh per statement, not per row
+CREATE OR REPLACE FUNCTION manga_card_refresh_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(SELECT DISTINCT manga_id FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_refresh_moved_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(
+        SELECT manga_id FROM old_rows UNION SELECT manga_id FROM changed_rows
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_refresh_tags()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(
+        SELECT DISTINCT h.manga_id FROM has h JOIN changed_rows c ON h.tag_id = c.tag_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_refresh_languages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(
+        SELECT DISTINCT s.manga_id FROM supports s JOIN changed_rows c ON s.language_id = c.language_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS manga_card_manga_insert ON MANGA;
+CREATE TRIGGER manga_card_manga_insert
+    AFTER INSERT ON MANGA REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+DROP TRIGGER IF EXISTS manga_card_manga_update ON MANGA;
+CREATE TRIGGER manga_card_manga_update
+    AFTER UPDATE ON MANGA REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+
+DROP TRIGGER IF EXISTS manga_card_has_insert ON has;
+CREATE TRIGGER manga_card_has_insert
+    AFTER INSERT ON has REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+DROP TRIGGER IF EXISTS manga_card_has_update ON has;
+CREATE TRIGGER manga_card_has_update
+    AFTER UPDATE ON has REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_moved_rows();
+DROP TRIGGER IF EXISTS manga_card_has_delete ON has;
+CREATE TRIGGER manga_card_has_delete
+    AFTER DELETE ON has REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+
+DROP TRIGGER IF EXISTS manga_card_supports_insert ON supports;
+CREATE TRIGGER manga_card_supports_insert
+    AFTER INSERT ON supports REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+DROP TRIGGER IF EXISTS manga_card_supports_update ON supports;
+CREATE TRIGGER manga_card_supports_update
+    AFTER UPDATE ON supports REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_moved_rows();
+DROP TRIGGER IF EXISTS manga_card_supports_delete ON supports;
+CREATE TRIGGER manga_card_supports_delete
+    AFTER DELETE ON supports REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_rows();
+
+DROP TRIGGER IF EXISTS manga_card_tag_update ON tag;
+CREATE TRIGGER manga_card_tag_update
+    AFTER UPDATE ON tag REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_tags();
+
+DROP TRIGGER IF EXISTS manga_card_language_update ON LANGUAGE;
+CREATE TRIGGER manga_card_language_update
+    AFTER UPDATE ON LANGUAGE REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_languages();
+
+-- Backfill
+SELECT refresh_manga_cards(ARRAY(SELECT manga_id FROM manga));
@@ -0,0 +1,142 @@
+-- Publish catalog changes on the catalog_changed channel so web workers can
+-- invalidate their in-process caches.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/004_catalog_notify.sql
+
+-- Payload: {"scope": "card"|"detail", "manga_ids": [...]} or, when too many
+-- manga changed to fit in a notification, {"scope": ..., "all": true}.
+-- "card" changes affect gallery listings; "detail" changes only affect the
+-- manga's own detail page.
+CREATE OR REPLACE FUNCTION notify_catalog_change(scope TEXT, ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    IF ids IS NULL OR cardinality(ids) = 0 THEN
+        RETURN;
+    END IF;
+    IF cardinality(ids) > 500 THEN
+        PERFORM pg_notify('catalog_changed', json_build_object('scope', scope, 'all', TRUE)::text);
+    ELSE
+        PERFORM pg_notify('catalog_changed', json_build_object('scope', scope, 'manga_ids', ids)::text);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger helpers; the scope is passed as the trigger argument
+CREATE OR REPLACE FUNCTION catalog_notify_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_catalog_change(TG_ARGV[0], ARRAY(SELECT DISTINCT manga_id FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_notify_translations()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_catalog_change(TG_ARGV[0], ARRAY(
+        SELECT DISTINCT c.manga_id FROM chapter c JOIN changed_rows r ON c.chapter_id = r.chapter_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_notify_authors()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_catalog_change(TG_ARGV[0], ARRAY(
+        SELECT DISTINCT w.manga_id FROM writes w JOIN changed_rows r ON w.author_id = r.author_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Card refreshes announce themselves
+CREATE OR REPLACE FUNCTION refresh_manga_cards(ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO manga_card (manga_id, title, status, publish_date, cover_path,
+                            tags, languages, language_keys, search_text)
+    SELECT
+        m.manga_id,
+        COALESCE(m.name_english, m.name_romanized, m.name_original, ''),
+        COALESCE(m.manga_status, 'unknown'),
+        m.started_publishing,
+        m.cover_path,
+        COALESCE(tg.tags, '{}'),
+        COALESCE(lg.languages, '{}'),
+        COALESCE(lg.language_keys, '{}'),
+        manga_search_text(m.name_english, m.name_romanized, m.name_original)
+            || ' ' || LOWER(COALESCE(array_to_string(tg.tags, ' '), ''))
+    FROM manga m
+    LEFT JOIN LATERAL (
+        SELECT ARRAY_AGG(t.tag_name ORDER BY t.tag_name) AS tags
+        FROM has h
+        JOIN tag t ON h.tag_id = t.tag_id
+        WHERE h.manga_id = m.manga_id
+    ) tg ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT ARRAY_AGG(l.language_name_en ORDER BY l.language_name_en) AS languages,
+               ARRAY_AGG(LOWER(l.language_name_en) ORDER BY l.language_name_en) AS language_keys
+        FROM supports s
+        JOIN language l ON s.language_id = l.language_id
+        WHERE s.manga_id = m.manga_id
+    ) lg ON TRUE
+    WHERE m.manga_id = ANY(ids)
+    ON CONFLICT (manga_id) DO UPDATE SET
+        title = EXCLUDED.title,
+        status = EXCLUDED.status,
+        publish_date = EXCLUDED.publish_date,
+        cover_path = EXCLUDED.cover_path,
+        tags = EXCLUDED.tags,
+        languages = EXCLUDED.languages,
+        language_keys = EXCLUDED.language_keys,
+        search_text = EXCLUDED.search_text;
+
+    PERFORM notify_catalog_change('card', ids);
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS catalog_notify_manga_delete ON MANGA;
+CREATE TRIGGER catalog_notify_manga_delete
+    AFTER DELETE ON MANGA REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('card');
+
+DROP TRIGGER IF EXISTS catalog_notify_chapter_insert ON CHAPTER;
+CREATE TRIGGER catalog_notify_chapter_insert
+    AFTER INSERT ON CHAPTER REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+DROP TRIGGER IF EXISTS catalog_notify_chapter_update ON CHAPTER;
+CREATE TRIGGER catalog_notify_chapter_update
+    AFTER UPDATE ON CHAPTER REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+DROP TRIGGER IF EXISTS catalog_notify_chapter_delete ON CHAPTER;
+CREATE TRIGGER catalog_notify_chapter_delete
+    AFTER DELETE ON CHAPTER REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+
+DROP TRIGGER IF EXISTS catalog_notify_translated_to_insert ON translated_to;
+CREATE TRIGGER catalog_notify_translated_to_insert
+    AFTER INSERT ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_translations('detail');
+DROP TRIGGER IF EXISTS catalog_notify_translated_to_update ON translated_to;
+CREATE TRIGGER catalog_notify_translated_to_update
+    AFTER UPDATE ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_translations('detail');
+DROP TRIGGER IF EXISTS catalog_notify_translated_to_delete ON translated_to;
+CREATE TRIGGER catalog_notify_translated_to_delete
+    AFTER DELETE ON translated_to REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_translations('detail');
+
+DROP TRIGGER IF EXISTS catalog_notify_writes_insert ON writes;
+CREATE TRIGGER catalog_notify_writes_insert
+    AFTER INSERT ON writes REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+DROP TRIGGER IF EXISTS catalog_notify_writes_delete ON writes;
+CREATE TRIGGER catalog_notify_writes_delete
+    AFTER DELETE ON writes REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_rows('detail');
+
+DROP TRIGGER IF EXISTS catalog_notify_author_update ON AUTHOR;
+CREATE TRIGGER catalog_notify_author_update
+    AFTER UPDATE ON AUTHOR REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_authors('detail');
@@ -0,0 +1,65 @@
+-- Columns and indexes for the SQL-computed gallery sections.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/005_gallery_sections.sql
+
+ALTER TABLE manga_card ADD COLUMN IF NOT EXISTS ended_date DATE;
+ALTER TABLE manga_card ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE;
+
+DROP INDEX IF EXISTS idx_manga_card_status;
+CREATE INDEX IF NOT EXISTS idx_manga_card_status_title ON manga_card (status, title, manga_id);
+CREATE INDEX IF NOT EXISTS idx_manga_card_created ON manga_card (created_at, manga_id);
+CREATE INDEX IF NOT EXISTS idx_manga_card_completed ON manga_card ((COALESCE(ended_date, '-infinity'::date)), manga_id)
+    WHERE status = 'completed';
+
+CREATE OR REPLACE FUNCTION refresh_manga_cards(ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO manga_card (manga_id, title, status, publish_date, ended_date,
+                            created_at, cover_path, tags, languages,
+                            language_keys, search_text)
+    SELECT
+        m.manga_id,
+        COALESCE(m.name_english, m.name_romanized, m.name_original, ''),
+        COALESCE(m.manga_status, 'unknown'),
+        m.started_publishing,
+        m.ended_publishing,
+        m.created_at,
+        m.cover_path,
+        COALESCE(tg.tags, '{}'),
+        COALESCE(lg.languages, '{}'),
+        COALESCE(lg.language_keys, '{}'),
+        manga_search_text(m.name_english, m.name_romanized, m.name_original)
+            || ' ' || LOWER(COALESCE(array_to_string(tg.tags, ' '), ''))
+    FROM manga m
+    LEFT JOIN LATERAL (
+        SELECT ARRAY_AGG(t.tag_name ORDER BY t.tag_name) AS tags
+        FROM has h
+        JOIN tag t ON h.tag_id = t.tag_id
+        WHERE h.manga_id = m.manga_id
+    ) tg ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT ARRAY_AGG(l.language_name_en ORDER BY l.language_name_en) AS languages,
+               ARRAY_AGG(LOWER(l.language_name_en) ORDER BY l.language_name_en) AS language_keys
+        FROM supports s
+        JOIN language l ON s.language_id = l.language_id
+        WHERE s.manga_id = m.manga_id
+    ) lg ON TRUE
+    WHERE m.manga_id = ANY(ids)
+    ON CONFLICT (manga_id) DO UPDATE SET
+        title = EXCLUDED.title,
+        status = EXCLUDED.status,
+        publish_date = EXCLUDED.publish_date,
+        ended_date = EXCLUDED.ended_date,
+        created_at = EXCLUDED.created_at,
+        cover_path = EXCLUDED.cover_path,
+        tags = EXCLUDED.tags,
+        languages = EXCLUDED.languages,
+        language_keys = EXCLUDED.language_keys,
+        search_text = EXCLUDED.search_text;
+
+    PERFORM notify_catalog_change('card', ids);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill the new columns
+SELECT refresh_manga_cards(ARRAY(SELECT manga_id FROM manga));
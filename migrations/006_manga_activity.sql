@@ -0,0 +1,135 @@
+-- Maintained last-activity timestamp for the "Just Updated" gallery section.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/006_manga_activity.sql
+
+ALTER TABLE manga_card ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMP WITH TIME ZONE;
+CREATE INDEX IF NOT EXISTS idx_manga_card_activity
+    ON manga_card (last_activity_at DESC NULLS LAST, manga_id DESC);
+
+CREATE OR REPLACE FUNCTION refresh_manga_cards(ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO manga_card (manga_id, title, status, publish_date, ended_date,
+                            created_at, last_activity_at, cover_path, tags, languages,
+                            language_keys, search_text)
+    SELECT
+        m.manga_id,
+        COALESCE(m.name_english, m.name_romanized, m.name_original, ''),
+        COALESCE(m.manga_status, 'unknown'),
+        m.started_publishing,
+        m.ended_publishing,
+        m.created_at,
+        GREATEST(m.created_at, act.last_chapter_at, act.last_translation_at),
+        m.cover_path,
+        COALESCE(tg.tags, '{}'),
+        COALESCE(lg.languages, '{}'),
+        COALESCE(lg.language_keys, '{}'),
+        manga_search_text(m.name_english, m.name_romanized, m.name_original)
+            || ' ' || LOWER(COALESCE(array_to_string(tg.tags, ' '), ''))
+    FROM manga m
+    LEFT JOIN LATERAL (
+        SELECT ARRAY_AGG(t.tag_name ORDER BY t.tag_name) AS tags
+        FROM has h
+        JOIN tag t ON h.tag_id = t.tag_id
+        WHERE h.manga_id = m.manga_id
+    ) tg ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT ARRAY_AGG(l.language_name_en ORDER BY l.language_name_en) AS languages,
+               ARRAY_AGG(LOWER(l.language_name_en) ORDER BY l.language_name_en) AS language_keys
+        FROM supports s
+        JOIN language l ON s.language_id = l.language_id
+        WHERE s.manga_id = m.manga_id
+    ) lg ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT MAX(c.created_at) AS last_chapter_at,
+               MAX(tt.translation_date)::timestamptz AS last_translation_at
+        FROM chapter c
+        LEFT JOIN translated_to tt ON tt.chapter_id = c.chapter_id
+        WHERE c.manga_id = m.manga_id
+    ) act ON TRUE
+    WHERE m.manga_id = ANY(ids)
+    ON CONFLICT (manga_id) DO UPDATE SET
+        title = EXCLUDED.title,
+        status = EXCLUDED.status,
+        publish_date = EXCLUDED.publish_date,
+        ended_date = EXCLUDED.ended_date,
+        created_at = EXCLUDED.created_at,
+        last_activity_at = EXCLUDED.last_activity_at,
+        cover_path = EXCLUDED.cover_path,
+        tags = EXCLUDED.tags,
+        languages = EXCLUDED.languages,
+        language_keys = EXCLUDED.language_keys,
+        search_text = EXCLUDED.search_text;
+
+    PERFORM notify_catalog_change('card', ids);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Last activity: new chapters and translations move a manga's
+-- last_activity_at forward without rebuilding its card. Activity only ever
+-- moves forward here; refresh_manga_cards recomputes it from scratch.
+CREATE OR REPLACE FUNCTION bump_manga_activity(ids INTEGER[], stamps TIMESTAMP WITH TIME ZONE[])
+RETURNS VOID AS $$
+DECLARE
+    touched INTEGER[];
+BEGIN
+    WITH activity AS (
+        SELECT a.manga_id, MAX(a.at) AS at
+        FROM unnest(ids, stamps) AS a(manga_id, at)
+        GROUP BY a.manga_id
+    ), updated AS (
+        UPDATE manga_card mc
+        SET last_activity_at = activity.at
+        FROM activity
+        WHERE mc.manga_id = activity.manga_id
+          AND (mc.last_activity_at IS NULL OR mc.last_activity_at < activity.at)
+        RETURNING mc.manga_id
+    )
+    SELECT ARRAY_AGG(manga_id) INTO touched FROM updated;
+
+    PERFORM notify_catalog_change('card', touched);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_chapter_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_manga_activity(ids, stamps)
+    FROM (
+        SELECT ARRAY_AGG(manga_id) AS ids,
+               ARRAY_AGG(COALESCE(created_at, now())) AS stamps
+        FROM changed_rows
+    ) a;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manga_card_translation_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_manga_activity(ids, stamps)
+    FROM (
+        SELECT ARRAY_AGG(c.manga_id) AS ids,
+               ARRAY_AGG(COALESCE(r.translation_date::timestamptz, now())) AS stamps
+        FROM changed_rows r
+        JOIN chapter c ON c.chapter_id = r.chapter_id
+    ) a;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS manga_card_chapter_activity ON chapter;
+DROP TRIGGER IF EXISTS manga_card_translated_to_insert_activity ON translated_to;
+DROP TRIGGER IF EXISTS manga_card_translated_to_update_activity ON translated_to;
+CREATE TRIGGER manga_card_chapter_activity
+    AFTER INSERT ON CHAPTER REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_chapter_activity();
+CREATE TRIGGER manga_card_translated_to_insert_activity
+    AFTER INSERT ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_translation_activity();
+CREATE TRIGGER manga_card_translated_to_update_activity
+    AFTER UPDATE ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_translation_activity();
+
+-- Backfill the new column
+SELECT refresh_manga_cards(ARRAY(SELECT manga_id FROM manga));
@@ -0,0 +1,52 @@
+-- Publish page changes on catalog_changed so web workers can invalidate
+-- their cached chapter page paths.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/007_page_notify.sql
+
+-- Page changes, for the web workers' page path caches. Payload:
+-- {"scope": "pages", "chapter_ids": [...]} or {"scope": "pages", "all": true}
+CREATE OR REPLACE FUNCTION notify_pages_change(ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    IF ids IS NULL OR cardinality(ids) = 0 THEN
+        RETURN;
+    END IF;
+    IF cardinality(ids) > 500 THEN
+        PERFORM pg_notify('catalog_changed', json_build_object('scope', 'pages', 'all', TRUE)::text);
+    ELSE
+        PERFORM pg_notify('catalog_changed', json_build_object('scope', 'pages', 'chapter_ids', ids)::text);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_notify_pages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_pages_change(ARRAY(SELECT DISTINCT chapter_id FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_notify_moved_pages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_pages_change(ARRAY(
+        SELECT chapter_id FROM old_rows UNION SELECT chapter_id FROM changed_rows
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS catalog_notify_pages_insert ON pages;
+DROP TRIGGER IF EXISTS catalog_notify_pages_update ON pages;
+DROP TRIGGER IF EXISTS catalog_notify_pages_delete ON pages;
+
+CREATE TRIGGER catalog_notify_pages_insert
+    AFTER INSERT ON PAGES REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_pages();
+CREATE TRIGGER catalog_notify_pages_update
+    AFTER UPDATE ON PAGES REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_moved_pages();
+CREATE TRIGGER catalog_notify_pages_delete
+    AFTER DELETE ON PAGES REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_pages();
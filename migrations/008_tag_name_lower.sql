@@ -0,0 +1,5 @@
+-- Case-insensitive tag name index used by the bulk tag upsert.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/008_tag_name_lower.sql
+
+CREATE INDEX IF NOT EXISTS idx_tag_name_lower ON tag (LOWER(tag_name));
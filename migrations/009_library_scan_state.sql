@@ -0,0 +1,13 @@
+-- State table for the incremental library scanner (scanner.py).
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/009_library_scan_state.sql
+
+CREATE TABLE IF NOT EXISTS library_scan_state (
+    dir_path TEXT PRIMARY KEY,
+    mtime_ns BIGINT NOT NULL,
+    chapter_id INTEGER NOT NULL REFERENCES CHAPTER (chapter_id) ON DELETE CASCADE,
+    language_id VARCHAR(10) NOT NULL REFERENCES LANGUAGE (language_id) ON DELETE CASCADE,
+    page_count INTEGER NOT NULL DEFAULT 0,
+    scanned_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_library_scan_state_chapter ON library_scan_state (chapter_id);
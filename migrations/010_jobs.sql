@@ -0,0 +1,30 @@
+-- Queue table for background jobs run by `python jobs.py`.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/010_jobs.sql
+
+CREATE TABLE IF NOT EXISTS job (
+    job_id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    label TEXT,
+    params JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    message TEXT,
+    result JSONB,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    return_url TEXT,
+    locked_by TEXT,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS idx_job_queue ON job (run_after, job_id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_job_running ON job (heartbeat_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_job_created ON job (created_at DESC);
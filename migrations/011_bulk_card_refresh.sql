@@ -0,0 +1,71 @@
+-- Set-based manga_card refresh, so bulk imports can rebuild many cards in
+-- one statement.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/011_bulk_card_refresh.sql
+
+CREATE OR REPLACE FUNCTION refresh_manga_cards(ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO manga_card (manga_id, title, status, publish_date, ended_date,
+                            created_at, last_activity_at, cover_path, tags, languages,
+                            language_keys, search_text)
+    SELECT
+        m.manga_id,
+        COALESCE(m.name_english, m.name_romanized, m.name_original, ''),
+        COALESCE(m.manga_status, 'unknown'),
+        m.started_publishing,
+        m.ended_publishing,
+        m.created_at,
+        GREATEST(m.created_at, act.last_chapter_at, act.last_translation_at),
+        m.cover_path,
+        COALESCE(tg.tags, '{}'),
+        COALESCE(lg.languages, '{}'),
+        COALESCE(lg.language_keys, '{}'),
+        manga_search_text(m.name_english, m.name_romanized, m.name_original)
+            || ' ' || LOWER(COALESCE(array_to_string(tg.tags, ' '), ''))
+    FROM manga m
+    -- Each part is aggregated once for the whole id set; per-manga lateral
+    -- lookups fall apart when a bulk import refreshes thousands of cards
+    -- against link tables the planner has no statistics for yet
+    LEFT JOIN (
+        SELECT h.manga_id, ARRAY_AGG(t.tag_name ORDER BY t.tag_name) AS tags
+        FROM has h
+        JOIN tag t ON h.tag_id = t.tag_id
+        WHERE h.manga_id = ANY(ids)
+        GROUP BY h.manga_id
+    ) tg ON tg.manga_id = m.manga_id
+    LEFT JOIN (
+        SELECT s.manga_id,
+               ARRAY_AGG(l.language_name_en ORDER BY l.language_name_en) AS languages,
+               ARRAY_AGG(LOWER(l.language_name_en) ORDER BY l.language_name_en) AS language_keys
+        FROM supports s
+        JOIN language l ON s.language_id = l.language_id
+        WHERE s.manga_id = ANY(ids)
+        GROUP BY s.manga_id
+    ) lg ON lg.manga_id = m.manga_id
+    LEFT JOIN (
+        SELECT c.manga_id,
+               MAX(c.created_at) AS last_chapter_at,
+               MAX(tt.translation_date)::timestamptz AS last_translation_at
+        FROM chapter c
+        LEFT JOIN translated_to tt ON tt.chapter_id = c.chapter_id
+        WHERE c.manga_id = ANY(ids)
+        GROUP BY c.manga_id
+    ) act ON act.manga_id = m.manga_id
+    WHERE m.manga_id = ANY(ids)
+    ON CONFLICT (manga_id) DO UPDATE SET
+        title = EXCLUDED.title,
+        status = EXCLUDED.status,
+        publish_date = EXCLUDED.publish_date,
+        ended_date = EXCLUDED.ended_date,
+        created_at = EXCLUDED.created_at,
+        last_activity_at = EXCLUDED.last_activity_at,
+        cover_path = EXCLUDED.cover_path,
+        tags = EXCLUDED.tags,
+        languages = EXCLUDED.languages,
+        language_keys = EXCLUDED.language_keys,
+        search_text = EXCLUDED.search_text;
+
+    PERFORM notify_catalog_change('card', ids);
+END;
+$$ LANGUAGE plpgsql;
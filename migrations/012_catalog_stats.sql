@@ -0,0 +1,289 @@
+-- Trigger-maintained counters for the admin dashboard.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/012_catalog_stats.sql
+-- The triggers and the initial count run in one transaction, so writes
+-- made while it runs are neither lost nor counted twice.
+
+BEGIN;
+
+-- Dashboard counters, kept current by statement-level triggers so the admin
+-- dashboard never counts the big tables. scope is '' for table totals and
+-- the language_id for per-language page counts. Triggers only append delta
+-- rows, so writers never queue on a shared counter row; a stat is the sum
+-- of its rows, and compact_catalog_stats() folds them back together.
+CREATE TABLE IF NOT EXISTS catalog_stats (
+    stat TEXT NOT NULL,
+    scope TEXT NOT NULL DEFAULT '',
+    value BIGINT NOT NULL DEFAULT 0
+);
+-- Earlier versions of this migration kept one row per stat
+ALTER TABLE catalog_stats DROP CONSTRAINT IF EXISTS catalog_stats_pkey;
+
+CREATE OR REPLACE FUNCTION add_catalog_stats(stats TEXT[], scopes TEXT[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO catalog_stats (stat, scope, value)
+    SELECT d.stat, d.scope, SUM(d.delta)
+    FROM unnest(stats, scopes, deltas) AS d(stat, scope, delta)
+    GROUP BY d.stat, d.scope
+    HAVING SUM(d.delta) <> 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fold the delta rows into one row per stat; run periodically by the job
+-- worker. Rows of transactions still in flight are not visible here and are
+-- left for the next run. The table lock only keeps compaction, TRUNCATE and
+-- rebuilds apart; trigger inserts do not wait for it.
+CREATE OR REPLACE FUNCTION compact_catalog_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE catalog_stats IN SHARE UPDATE EXCLUSIVE MODE;
+    WITH folded AS (
+        DELETE FROM catalog_stats RETURNING stat, scope, value
+    )
+    INSERT INTO catalog_stats (stat, scope, value)
+    SELECT stat, scope, SUM(value)::BIGINT
+    FROM folded
+    GROUP BY stat, scope
+    HAVING SUM(value) <> 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row counts; the stat name is passed as the trigger argument
+CREATE OR REPLACE FUNCTION catalog_stats_count_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_catalog_stats(
+        ARRAY[TG_ARGV[0]], ARRAY[''],
+        ARRAY[(SELECT CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END FROM changed_rows)]
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Page counts per language, and how many chapters have pages at all. A
+-- chapter counts from its first page until its last one is gone; its page
+-- count before the statement is its count now minus the change. Writers of
+-- the same chapter take turns, so the count also sees pages committed by
+-- the one before; otherwise two first pages would both count the chapter.
+CREATE OR REPLACE FUNCTION add_page_stats(chapter_ids INTEGER[], language_ids TEXT[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('chapters_with_pages'), c.chapter_id)
+    FROM (SELECT DISTINCT unnest(chapter_ids) AS chapter_id ORDER BY 1) c;
+    PERFORM add_catalog_stats(ARRAY_AGG(s.stat), ARRAY_AGG(s.scope), ARRAY_AGG(s.delta::BIGINT))
+    FROM (
+        SELECT 'pages' AS stat, d.language_id AS scope, SUM(d.delta) AS delta
+        FROM unnest(language_ids, deltas) AS d(language_id, delta)
+        GROUP BY d.language_id
+        UNION ALL
+        SELECT 'chapters_with_pages', '', SUM((c.now > 0)::INTEGER - (c.now - c.delta > 0)::INTEGER)
+        FROM (
+            SELECT d.chapter_id, SUM(d.delta) AS delta,
+                   (SELECT COUNT(*) FROM pages p WHERE p.chapter_id = d.chapter_id) AS now
+            FROM unnest(chapter_ids, deltas) AS d(chapter_id, delta)
+            GROUP BY d.chapter_id
+        ) c
+    ) s;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_stats_pages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_page_stats(ARRAY_AGG(r.chapter_id), ARRAY_AGG(r.language_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT chapter_id, language_id,
+               CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END AS delta
+        FROM changed_rows
+        GROUP BY chapter_id, language_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only pages moved to another chapter or language change the counters
+CREATE OR REPLACE FUNCTION catalog_stats_moved_pages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_page_stats(ARRAY_AGG(r.chapter_id), ARRAY_AGG(r.language_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT m.chapter_id, m.language_id, SUM(m.delta) AS delta
+        FROM old_rows o
+        JOIN changed_rows n ON n.page_id = o.page_id
+        CROSS JOIN LATERAL (
+            VALUES (o.chapter_id, o.language_id, -1), (n.chapter_id, n.language_id, 1)
+        ) AS m(chapter_id, language_id, delta)
+        WHERE (o.chapter_id, o.language_id) IS DISTINCT FROM (n.chapter_id, n.language_id)
+        GROUP BY m.chapter_id, m.language_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Chapters with at least one translation, serialized per chapter like
+-- add_page_stats
+CREATE OR REPLACE FUNCTION add_translation_stats(chapter_ids INTEGER[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('translated_chapters'), c.chapter_id)
+    FROM (SELECT DISTINCT unnest(chapter_ids) AS chapter_id ORDER BY 1) c;
+    PERFORM add_catalog_stats(ARRAY['translated_chapters'], ARRAY[''], ARRAY[
+        SUM((c.now > 0)::INTEGER - (c.now - c.delta > 0)::INTEGER)
+    ])
+    FROM (
+        SELECT d.chapter_id, SUM(d.delta) AS delta,
+               (SELECT COUNT(*) FROM translated_to t WHERE t.chapter_id = d.chapter_id) AS now
+        FROM unnest(chapter_ids, deltas) AS d(chapter_id, delta)
+        GROUP BY d.chapter_id
+    ) c;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_stats_translations()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_translation_stats(ARRAY_AGG(r.chapter_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT chapter_id, CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END AS delta
+        FROM changed_rows
+        GROUP BY chapter_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION catalog_stats_moved_translations()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_translation_stats(ARRAY_AGG(r.chapter_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT chapter_id, SUM(delta) AS delta
+        FROM (
+            SELECT chapter_id, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT chapter_id, 1 FROM changed_rows
+        ) m
+        GROUP BY chapter_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE drops the listed stats; missing stats read as zero
+CREATE OR REPLACE FUNCTION catalog_stats_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+    LOCK TABLE catalog_stats IN SHARE UPDATE EXCLUSIVE MODE;
+    DELETE FROM catalog_stats WHERE stat = ANY(TG_ARGV);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recount everything, e.g. after loading data with triggers disabled
+CREATE OR REPLACE FUNCTION rebuild_catalog_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE manga, chapter, author, tag, pages, translated_to IN SHARE MODE;
+    LOCK TABLE catalog_stats IN SHARE UPDATE EXCLUSIVE MODE;
+    DELETE FROM catalog_stats;
+    INSERT INTO catalog_stats (stat, scope, value)
+    SELECT 'manga', '', COUNT(*) FROM manga
+    UNION ALL SELECT 'chapters', '', COUNT(*) FROM chapter
+    UNION ALL SELECT 'authors', '', COUNT(*) FROM author
+    UNION ALL SELECT 'tags', '', COUNT(*) FROM tag
+    UNION ALL SELECT 'pages', language_id, COUNT(*) FROM pages GROUP BY language_id
+    UNION ALL SELECT 'chapters_with_pages', '', COUNT(DISTINCT chapter_id) FROM pages
+    UNION ALL SELECT 'translated_chapters', '', COUNT(DISTINCT chapter_id) FROM translated_to;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS catalog_stats_manga_insert ON MANGA;
+CREATE TRIGGER catalog_stats_manga_insert
+    AFTER INSERT ON MANGA REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('manga');
+DROP TRIGGER IF EXISTS catalog_stats_manga_delete ON MANGA;
+CREATE TRIGGER catalog_stats_manga_delete
+    AFTER DELETE ON MANGA REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('manga');
+DROP TRIGGER IF EXISTS catalog_stats_manga_truncate ON MANGA;
+CREATE TRIGGER catalog_stats_manga_truncate
+    AFTER TRUNCATE ON MANGA
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('manga');
+
+DROP TRIGGER IF EXISTS catalog_stats_chapter_insert ON CHAPTER;
+CREATE TRIGGER catalog_stats_chapter_insert
+    AFTER INSERT ON CHAPTER REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('chapters');
+DROP TRIGGER IF EXISTS catalog_stats_chapter_delete ON CHAPTER;
+CREATE TRIGGER catalog_stats_chapter_delete
+    AFTER DELETE ON CHAPTER REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('chapters');
+DROP TRIGGER IF EXISTS catalog_stats_chapter_truncate ON CHAPTER;
+CREATE TRIGGER catalog_stats_chapter_truncate
+    AFTER TRUNCATE ON CHAPTER
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('chapters');
+
+DROP TRIGGER IF EXISTS catalog_stats_author_insert ON AUTHOR;
+CREATE TRIGGER catalog_stats_author_insert
+    AFTER INSERT ON AUTHOR REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('authors');
+DROP TRIGGER IF EXISTS catalog_stats_author_delete ON AUTHOR;
+CREATE TRIGGER catalog_stats_author_delete
+    AFTER DELETE ON AUTHOR REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('authors');
+DROP TRIGGER IF EXISTS catalog_stats_author_truncate ON AUTHOR;
+CREATE TRIGGER catalog_stats_author_truncate
+    AFTER TRUNCATE ON AUTHOR
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('authors');
+
+DROP TRIGGER IF EXISTS catalog_stats_tag_insert ON tag;
+CREATE TRIGGER catalog_stats_tag_insert
+    AFTER INSERT ON tag REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('tags');
+DROP TRIGGER IF EXISTS catalog_stats_tag_delete ON tag;
+CREATE TRIGGER catalog_stats_tag_delete
+    AFTER DELETE ON tag REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_count_rows('tags');
+DROP TRIGGER IF EXISTS catalog_stats_tag_truncate ON tag;
+CREATE TRIGGER catalog_stats_tag_truncate
+    AFTER TRUNCATE ON tag
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('tags');
+
+DROP TRIGGER IF EXISTS catalog_stats_pages_insert ON PAGES;
+CREATE TRIGGER catalog_stats_pages_insert
+    AFTER INSERT ON PAGES REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_pages();
+DROP TRIGGER IF EXISTS catalog_stats_pages_update ON PAGES;
+CREATE TRIGGER catalog_stats_pages_update
+    AFTER UPDATE ON PAGES REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_moved_pages();
+DROP TRIGGER IF EXISTS catalog_stats_pages_delete ON PAGES;
+CREATE TRIGGER catalog_stats_pages_delete
+    AFTER DELETE ON PAGES REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_pages();
+DROP TRIGGER IF EXISTS catalog_stats_pages_truncate ON PAGES;
+CREATE TRIGGER catalog_stats_pages_truncate
+    AFTER TRUNCATE ON PAGES
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('pages', 'chapters_with_pages');
+
+DROP TRIGGER IF EXISTS catalog_stats_translated_to_insert ON translated_to;
+CREATE TRIGGER catalog_stats_translated_to_insert
+    AFTER INSERT ON translated_to REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_translations();
+DROP TRIGGER IF EXISTS catalog_stats_translated_to_update ON translated_to;
+CREATE TRIGGER catalog_stats_translated_to_update
+    AFTER UPDATE ON translated_to REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_moved_translations();
+DROP TRIGGER IF EXISTS catalog_stats_translated_to_delete ON translated_to;
+CREATE TRIGGER catalog_stats_translated_to_delete
+    AFTER DELETE ON translated_to REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_translations();
+DROP TRIGGER IF EXISTS catalog_stats_translated_to_truncate ON translated_to;
+CREATE TRIGGER catalog_stats_translated_to_truncate
+    AFTER TRUNCATE ON translated_to
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_truncate('translated_chapters');
+
+SELECT rebuild_catalog_stats();
+
+COMMIT;
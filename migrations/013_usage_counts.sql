@@ -0,0 +1,200 @@
+-- Usage counts on tags and authors, maintained from has and writes, plus
+-- the indexes behind the paginated admin tag and author lists.
+-- Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/013_usage_counts.sql
+
+BEGIN;
+
+ALTER TABLE tag ADD COLUMN IF NOT EXISTS manga_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE AUTHOR ADD COLUMN IF NOT EXISTS manga_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_tag_usage ON tag (manga_count, tag_id);
+CREATE INDEX IF NOT EXISTS idx_author_name_key ON AUTHOR (name_romanized, author_id);
+CREATE INDEX IF NOT EXISTS idx_author_usage ON AUTHOR (manga_count, author_id);
+CREATE INDEX IF NOT EXISTS idx_author_name_trgm
+    ON AUTHOR USING GIN (LOWER(name_romanized) gin_trgm_ops);
+
+-- Only renamed tags change cards; usage count updates do not
+CREATE OR REPLACE FUNCTION manga_card_refresh_tags()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_cards(ARRAY(
+        SELECT DISTINCT h.manga_id
+        FROM changed_rows c
+        JOIN old_rows o ON o.tag_id = c.tag_id
+        JOIN has h ON h.tag_id = c.tag_id
+        WHERE c.tag_name IS DISTINCT FROM o.tag_name
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS manga_card_tag_update ON tag;
+CREATE TRIGGER manga_card_tag_update
+    AFTER UPDATE ON tag REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION manga_card_refresh_tags();
+
+-- Only renamed authors are announced; usage count updates are not
+CREATE OR REPLACE FUNCTION catalog_notify_authors()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_catalog_change(TG_ARGV[0], ARRAY(
+        SELECT DISTINCT w.manga_id
+        FROM changed_rows r
+        JOIN old_rows o ON o.author_id = r.author_id
+        JOIN writes w ON w.author_id = r.author_id
+        WHERE r.name_romanized IS DISTINCT FROM o.name_romanized
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS catalog_notify_author_update ON AUTHOR;
+CREATE TRIGGER catalog_notify_author_update
+    AFTER UPDATE ON AUTHOR REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_notify_authors('detail');
+
+-- Usage counts: tag.manga_count and author.manga_count follow the rows in
+-- has and writes, so the admin lists can sort by them without counting
+CREATE OR REPLACE FUNCTION add_tag_usage(tag_ids INTEGER[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    -- Locked in id order, so concurrent statements cannot deadlock
+    PERFORM 1 FROM tag WHERE tag_id = ANY(tag_ids) ORDER BY tag_id FOR NO KEY UPDATE;
+    UPDATE tag t SET manga_count = t.manga_count + d.delta
+    FROM (
+        SELECT d.tag_id, SUM(d.delta) AS delta
+        FROM unnest(tag_ids, deltas) AS d(tag_id, delta)
+        GROUP BY d.tag_id
+    ) d
+    WHERE t.tag_id = d.tag_id AND d.delta <> 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION add_author_usage(author_ids INTEGER[], deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM 1 FROM author WHERE author_id = ANY(author_ids) ORDER BY author_id FOR NO KEY UPDATE;
+    UPDATE author a SET manga_count = a.manga_count + d.delta
+    FROM (
+        SELECT d.author_id, SUM(d.delta) AS delta
+        FROM unnest(author_ids, deltas) AS d(author_id, delta)
+        GROUP BY d.author_id
+    ) d
+    WHERE a.author_id = d.author_id AND d.delta <> 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tag_usage_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_tag_usage(ARRAY_AGG(r.tag_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT tag_id, CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END AS delta
+        FROM changed_rows
+        GROUP BY tag_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tag_usage_moved_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_tag_usage(ARRAY_AGG(r.tag_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT tag_id, -1::BIGINT AS delta FROM old_rows
+        UNION ALL
+        SELECT tag_id, 1 FROM changed_rows
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION author_usage_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_author_usage(ARRAY_AGG(r.author_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT author_id, CASE TG_OP WHEN 'DELETE' THEN -COUNT(*) ELSE COUNT(*) END AS delta
+        FROM changed_rows
+        GROUP BY author_id
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION author_usage_moved_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM add_author_usage(ARRAY_AGG(r.author_id), ARRAY_AGG(r.delta))
+    FROM (
+        SELECT author_id, -1::BIGINT AS delta FROM old_rows
+        UNION ALL
+        SELECT author_id, 1 FROM changed_rows
+    ) r;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE of has or writes; the counted table is the trigger argument
+CREATE OR REPLACE FUNCTION usage_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format('UPDATE %I SET manga_count = 0 WHERE manga_count <> 0', TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tag_usage_has_insert ON has;
+CREATE TRIGGER tag_usage_has_insert
+    AFTER INSERT ON has REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_rows();
+DROP TRIGGER IF EXISTS tag_usage_has_update ON has;
+CREATE TRIGGER tag_usage_has_update
+    AFTER UPDATE ON has REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_moved_rows();
+DROP TRIGGER IF EXISTS tag_usage_has_delete ON has;
+CREATE TRIGGER tag_usage_has_delete
+    AFTER DELETE ON has REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_rows();
+DROP TRIGGER IF EXISTS tag_usage_has_truncate ON has;
+CREATE TRIGGER tag_usage_has_truncate
+    AFTER TRUNCATE ON has
+    FOR EACH STATEMENT EXECUTE FUNCTION usage_truncate('tag');
+
+DROP TRIGGER IF EXISTS author_usage_writes_insert ON writes;
+CREATE TRIGGER author_usage_writes_insert
+    AFTER INSERT ON writes REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION author_usage_rows();
+DROP TRIGGER IF EXISTS author_usage_writes_update ON writes;
+CREATE TRIGGER author_usage_writes_update
+    AFTER UPDATE ON writes REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION author_usage_moved_rows();
+DROP TRIGGER IF EXISTS author_usage_writes_delete ON writes;
+CREATE TRIGGER author_usage_writes_delete
+    AFTER DELETE ON writes REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION author_usage_rows();
+DROP TRIGGER IF EXISTS author_usage_writes_truncate ON writes;
+CREATE TRIGGER author_usage_writes_truncate
+    AFTER TRUNCATE ON writes
+    FOR EACH STATEMENT EXECUTE FUNCTION usage_truncate('author');
+
+-- Initial counts; the triggers above keep them from here on
+LOCK TABLE has, writes IN SHARE MODE;
+UPDATE tag t SET manga_count = c.n
+FROM (
+    SELECT t.tag_id, COUNT(h.tag_id) AS n
+    FROM tag t LEFT JOIN has h ON h.tag_id = t.tag_id
+    GROUP BY t.tag_id
+) c
+WHERE t.tag_id = c.tag_id AND t.manga_count <> c.n;
+UPDATE author a SET manga_count = c.n
+FROM (
+    SELECT a.author_id, COUNT(w.author_id) AS n
+    FROM author a LEFT JOIN writes w ON w.author_id = a.author_id
+    GROUP BY a.author_id
+) c
+WHERE a.author_id = c.author_id AND a.manga_count <> c.n;
+
+COMMIT;
@@ -0,0 +1,34 @@
+-- Make tag names unique regardless of case, so concurrent upserts of
+-- "Action" and "action" cannot both create a tag. Tags that differ only in
+-- case are merged into the oldest one first; its manga keep every tag they
+-- had. Apply to an existing database with:
+--   psql "$DATABASE_URL" -f migrations/014_tag_name_unique.sql
+
+BEGIN;
+
+LOCK TABLE tag, has IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TEMP TABLE tag_merge ON COMMIT DROP AS
+SELECT t.tag_id, k.keep_id
+FROM tag t
+JOIN (
+    SELECT LOWER(tag_name) AS key, MIN(tag_id) AS keep_id
+    FROM tag
+    GROUP BY LOWER(tag_name)
+    HAVING COUNT(*) > 1
+) k ON LOWER(t.tag_name) = k.key
+WHERE t.tag_id <> k.keep_id;
+
+INSERT INTO has (tag_id, manga_id)
+SELECT m.keep_id, h.manga_id
+FROM has h
+JOIN tag_merge m ON m.tag_id = h.tag_id
+ON CONFLICT (tag_id, manga_id) DO NOTHING;
+
+-- has rows of the merged tags go with them (ON DELETE CASCADE)
+DELETE FROM tag WHERE tag_id IN (SELECT tag_id FROM tag_merge);
+
+DROP INDEX IF EXISTS idx_tag_name_lower;
+CREATE UNIQUE INDEX idx_tag_name_lower ON tag (LOWER(tag_name));
+
+COMMIT;
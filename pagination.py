@@ -0,0 +1,139 @@
+import base64
+import binascii
+import json
+import os
+
+# Lists the planner expects to hold more rows than this show its estimate
+# instead of an exact COUNT(*)
+EXACT_COUNT_LIMIT = int(os.environ.get("EXACT_COUNT_LIMIT", 10000))
+
+
+def encode_cursor(values):
+    """Encode sort key values into an opaque URL-safe cursor"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, length):
+    """Decode a cursor produced by encode_cursor, or None if it is invalid"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    return values
+
+
+class Keyset:
+    """Keyset (seek) pagination over an ordered list of SQL sort keys
+
+    All keys sort in the same direction and the last key must be unique, so
+    the position after a row is a single row comparison that a matching
+    btree index can seek to. Key values travel through the cursor as text
+    and are cast back by Postgres when compared.
+    """
+
+    def __init__(self, columns, descending=False, prefix="sort_key"):
+        self.columns = list(columns)
+        self.descending = descending
+        self.prefix = prefix
+
+    @property
+    def aliases(self):
+        return [f"{self.prefix}_{i}" for i in range(len(self.columns))]
+
+    def select_sql(self):
+        """Select-list entries exposing each sort key as text"""
+        return ", ".join(
+            f"({column})::text AS {alias}"
+            for column, alias in zip(self.columns, self.aliases)
+        )
+
+    def order_by_sql(self, reverse=False):
+        direction = "DESC" if self.descending != reverse else "ASC"
+        return ", ".join(f"{column} {direction}" for column in self.columns)
+
+    def after_sql(self, values, reverse=False):
+        """Return (sql, params) selecting rows that sort after ``values``
+
+        With ``reverse`` the rows sorting before ``values`` are selected.
+        """
+        op = "<" if self.descending != reverse else ">"
+        columns = ", ".join(self.columns)
+        placeholders = ", ".join(["%s"] * len(values))
+        return f"({columns}) {op} ({placeholders})", list(values)
+
+    def decode(self, token):
+        return decode_cursor(token, len(self.columns))
+
+    def cursor_for(self, row):
+        """Cursor pointing just after ``row``"""
+        return encode_cursor(row[alias] for alias in self.aliases)
+
+
+class KeysetPage:
+    """One page of rows plus the cursors of the pages around it"""
+
+    def __init__(self, rows, prev_cursor=None, next_cursor=None):
+        self.rows = rows
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+        self.total = None
+        self.exact = True
+
+
+def fetch_page(cur, keyset, query, params=(), after=None, before=None, limit=20):
+    """Fetch the ``limit`` rows of ``query`` after (or before) a cursor
+
+    ``query`` must select the keyset's columns. One extra row is fetched to
+    tell whether another page follows, so each page is a single index seek
+    however deep it is.
+    """
+    values = keyset.decode(before)
+    backwards = values is not None
+    if not backwards:
+        values = keyset.decode(after)
+
+    sql = f"SELECT q.*, {keyset.select_sql()} FROM ({query}) q"
+    seek_params = []
+    if values:
+        seek_sql, seek_params = keyset.after_sql(values, reverse=backwards)
+        sql += f" WHERE {seek_sql}"
+    sql += f" ORDER BY {keyset.order_by_sql(reverse=backwards)} LIMIT %s"
+    cur.execute(sql, [*params, *seek_params, limit + 1])
+    rows = cur.fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    if not backwards:
+        return KeysetPage(
+            rows,
+            keyset.cursor_for(rows[0]) if values and rows else None,
+            keyset.cursor_for(rows[-1]) if more else None,
+        )
+    if not more:
+        # Back at the start, which may hold more rows than were left
+        return fetch_page(cur, keyset, query, params, limit=limit)
+    rows.reverse()
+    return KeysetPage(rows, keyset.cursor_for(rows[0]), keyset.cursor_for(rows[-1]))
+
+
+def count_rows(cur, query, params=(), exact_limit=None):
+    """Return (count, exact) for the rows ``query`` selects
+
+    The planner's estimate is taken first; the rows are only counted when
+    it expects no more than ``exact_limit`` of them, so large lists never
+    pay for a full scan.
+    """
+    if exact_limit is None:
+        exact_limit = EXACT_COUNT_LIMIT
+    cur.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+    estimate = int(cur.fetchone()[0][0]["Plan"]["Plan Rows"])
+    if estimate > exact_limit:
+        return estimate, False
+    cur.execute(f"SELECT COUNT(*) FROM ({query}) q", params)
+    return cur.fetchone()[0], True
@@ -0,0 +1,57 @@
+"""Index-backed manga search
+
+The public gallery searches ``manga_card.search_text`` (all three titles
+plus tag names), served by a pg_trgm GIN index. Admin lookups search the
+``manga`` table through ``manga_search_text()``, which has its own trigram
+index; tags are looked up through the index on ``LOWER(tag_name)``.
+"""
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace in a user search query"""
+    return " ".join((query or "").lower().split())
+
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_text_sql(alias="m"):
+    """SQL expression matching the trigram index on manga titles"""
+    return (
+        f"manga_search_text({alias}.name_english, {alias}.name_romanized, "
+        f"{alias}.name_original)"
+    )
+
+
+def manga_search_filter(query, alias="mc"):
+    """Return (sql, params) restricting the manga_card ``alias`` to matches
+
+    A card matches when its titles or tags contain the query, or one of
+    their words is trigram-similar to it. Both conditions are served by the
+    same GIN index, so the cost follows the number of matches, not the
+    catalog size.
+    """
+    query = normalize_query(query)
+    sql = f"({alias}.search_text LIKE %s OR %s <%% {alias}.search_text)"
+    return sql, [f"%{escape_like(query)}%", query]
+
+
+def manga_search_rank(query, alias="mc"):
+    """Return (sql, params) for a relevance score, higher is better
+
+    Matches at the start of the English (or first available) title rank
+    above matches anywhere in the titles or tags, which rank above fuzzy
+    word matches.
+    """
+    query = normalize_query(query)
+    escaped = escape_like(query)
+    sql = f"""
+        (CASE
+            WHEN {alias}.search_text LIKE %s THEN 2
+            WHEN {alias}.search_text LIKE %s THEN 1
+            ELSE 0
+         END + word_similarity(%s, {alias}.search_text))
+    """
+    return sql, [f"{escaped}%", f"%{escaped}%", query]
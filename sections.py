@@ -0,0 +1,64 @@
+import collections
+
+# A gallery section is a bounded query over manga_card. ``where`` and
+# ``order_by`` must be servable by an index on manga_card so each section
+# costs O(limit) regardless of catalog size.
+Section = collections.namedtuple(
+    "Section", ["key", "title", "where", "order_by", "limit"], defaults=[6]
+)
+
+GALLERY_SECTIONS = [
+    Section(
+        "just_updated",
+        "Just Updated",
+        "TRUE",
+        "mc.last_activity_at DESC NULLS LAST, mc.manga_id DESC",
+    ),
+    Section(
+        "new_this_month",
+        "New This Month",
+        "mc.created_at >= date_trunc('month', now())",
+        "mc.created_at DESC, mc.manga_id DESC",
+    ),
+    Section(
+        "recently_completed",
+        "Recently Completed",
+        "mc.status = 'completed'",
+        "COALESCE(mc.ended_date, '-infinity'::date) DESC, mc.manga_id DESC",
+    ),
+    Section(
+        "ongoing",
+        "Ongoing",
+        "mc.status = 'ongoing'",
+        "mc.title ASC, mc.manga_id ASC",
+    ),
+    Section(
+        "hiatus",
+        "On Hiatus",
+        "mc.status = 'hiatus'",
+        "mc.title ASC, mc.manga_id ASC",
+    ),
+]
+
+
+def sections_query(sections, columns):
+    """Return (sql, params) fetching every section in a single round trip
+
+    Each section becomes a parenthesized ``ORDER BY ... LIMIT`` subquery,
+    combined with UNION ALL and labelled with a ``section`` column. Rows of
+    a section come back in that section's order.
+    """
+    parts = []
+    params = []
+    for section in sections:
+        parts.append(
+            f"""
+            (SELECT %s AS section, {columns}
+             FROM manga_card mc
+             WHERE {section.where}
+             ORDER BY {section.order_by}
+             LIMIT %s)
+            """
+        )
+        params.extend([section.key, section.limit])
+    return " UNION ALL ".join(parts), params